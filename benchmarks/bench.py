@@ -0,0 +1,253 @@
+"""Benchmark suite of the background image generation stages.
+
+For every module in `tilebg.patterns`, the geometry construction, the grid
+generation and the SVG generation are timed at each of the target resolutions.
+In addition, the construction of fractal islands is timed for a sweep of
+iteration counts with both path backends, as well as in rings of integers.
+Results, including the peak memory allocated by each stage, are written as
+JSON. Optionally, timings are compared to a stored baseline and the script
+fails if any stage regressed beyond a threshold factor.
+
+Example:
+
+    python benchmarks/bench.py --output bench.json
+    python benchmarks/bench.py --baseline bench.json --threshold 1.25
+
+"""
+
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from tilebg import patterns
+from tilebg.cache import set_cache
+from tilebg.functools import clear_memoized
+from tilebg.gosper import gosper_island, gosper_ring_island
+from tilebg.minkowski import minkowski_island, minkowski_ring_island
+from tilebg.svg import generate_svg
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "4k": (3840, 2160),
+    "8k": (7680, 4320),
+}
+
+ISLANDS = {"gosper": gosper_island, "minkowski": minkowski_island}
+
+RING_ISLANDS = {
+    "gosper": gosper_ring_island,
+    "minkowski": minkowski_ring_island,
+}
+
+# Exact derivation grows too slow beyond this number of iterations
+MAX_EXACT_ITERATIONS = 3
+
+# Fields of a record identifying the benchmark, as opposed to measurements
+KEY_FIELDS = {
+    "pattern",
+    "resolution",
+    "island",
+    "iterations",
+    "backend",
+    "stage",
+}
+
+
+def measure(
+    fn: Callable[[], Any],
+    *,
+    repeat: int,
+    setup: Callable[[], Any] = lambda: None,
+) -> tuple[float, int, Any]:
+    """Return best wall time, peak allocated memory and result of `fn`.
+
+    Function `setup` is called before each run, outside the measurement.
+    """
+    setup()
+    tracemalloc.start()
+    result = fn()
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seconds = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds), peak_bytes, result
+
+
+def bench_pattern(
+    name: str, resolution: tuple[int, int], repeat: int
+) -> list[dict[str, Any]]:
+    """Return benchmark records of every stage of a pattern."""
+    module = patterns.load(name)
+
+    def parameters() -> dict[str, Any]:
+        return module.parameters(resolution=resolution)
+
+    def grid() -> dict[str, Any]:
+        params = parameters()
+        params["paths"] = list(params["paths"])
+        return params
+
+    geometry = measure(parameters, repeat=repeat, setup=clear_memoized)
+    layout = measure(grid, repeat=repeat)
+    params = layout[2]
+    serialization = measure(lambda: generate_svg(**params), repeat=repeat)
+
+    common = dict(
+        pattern=name,
+        resolution=list(resolution),
+        tiles=len(params["paths"]),
+    )
+    return [
+        dict(common, stage=stage, seconds=seconds, peak_bytes=peak_bytes)
+        for stage, (seconds, peak_bytes, _) in [
+            ("geometry", geometry),
+            ("generate_grid", layout),
+            ("generate_svg", serialization),
+        ]
+    ] + [
+        dict(
+            common,
+            stage="svg_bytes",
+            bytes=len(serialization[2].encode()),
+        )
+    ]
+
+
+def bench_island(
+    name: str, iterations: int, backend: str, repeat: int
+) -> dict[str, Any]:
+    """Return a benchmark record of the construction of an island."""
+    if backend == "ring":
+        island = partial(RING_ISLANDS[name], iterations)
+    else:
+        island = partial(ISLANDS[name], iterations, backend=backend)
+    seconds, peak_bytes, points = measure(
+        island,
+        repeat=repeat,
+        setup=clear_memoized,
+    )
+    return dict(
+        island=name,
+        iterations=iterations,
+        backend=backend,
+        stage="island",
+        points=len(points),
+        seconds=seconds,
+        peak_bytes=peak_bytes,
+    )
+
+
+def record_key(record: dict[str, Any]) -> str:
+    """Return a key identifying the benchmark of a record."""
+    return json.dumps(
+        {k: v for k, v in record.items() if k in KEY_FIELDS}, sort_keys=True
+    )
+
+
+def regressions(
+    records: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    threshold: float,
+) -> list[str]:
+    """Return descriptions of stages slower than `threshold` x baseline."""
+    baseline_seconds = {
+        record_key(record): record["seconds"]
+        for record in baseline
+        if "seconds" in record
+    }
+    messages = []
+    for record in records:
+        key = record_key(record)
+        if "seconds" not in record or key not in baseline_seconds:
+            continue
+        ratio = record["seconds"] / max(baseline_seconds[key], 1e-9)
+        if ratio > threshold:
+            messages.append(f"{key}: {ratio:.2f}x slower than baseline")
+    return messages
+
+
+def main() -> None:
+    """Parse CLI arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--patterns",
+        nargs="+",
+        choices=patterns.PATTERNS,
+        default=patterns.PATTERNS,
+    )
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        choices=RESOLUTIONS,
+        default=list(RESOLUTIONS),
+    )
+    parser.add_argument(
+        "--iterations",
+        nargs="+",
+        type=int,
+        default=[1, 2, 3, 4, 5, 6],
+        help="iteration counts of the island construction sweep",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "-o", "--output", help="path of the JSON results (default: stdout)"
+    )
+    parser.add_argument("--baseline", help="path of baseline JSON results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="maximum tolerated slowdown factor relative to the baseline",
+    )
+    args = parser.parse_args()
+
+    # Measure geometry construction rather than on-disk cache loads
+    set_cache(None)
+
+    records = []
+    for name in args.patterns:
+        for resolution_name in args.resolutions:
+            print(f"Benchmarking {name} @ {resolution_name}", file=sys.stderr)
+            records += bench_pattern(
+                name, RESOLUTIONS[resolution_name], args.repeat
+            )
+    for name in ISLANDS:
+        for iterations in args.iterations:
+            print(
+                f"Benchmarking {name} island ({iterations})", file=sys.stderr
+            )
+            for backend in ("sympy", "numpy", "ring"):
+                if backend == "sympy" and iterations > MAX_EXACT_ITERATIONS:
+                    continue
+                records.append(
+                    bench_island(name, iterations, backend, args.repeat)
+                )
+
+    results_str = json.dumps(records, indent=2)
+    if args.output is None:
+        print(results_str)
+    else:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(results_str)
+
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        messages = regressions(records, baseline, args.threshold)
+        for message in messages:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        if messages:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
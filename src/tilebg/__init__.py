@@ -1,9 +1,31 @@
-from . import (
-    functools,
-    gosper,
-    grid,
-    minkowski,
-    path,
-    patterns,
-    svg,
+"""Seamless geometric desktop background image generator.
+
+Submodules are imported on first access, so that the command-line interface
+only pays for the modules it actually uses.
+
+"""
+
+from importlib import import_module
+from types import ModuleType
+
+_SUBMODULES = (
+    "batch",
+    "cache",
+    "functools",
+    "gosper",
+    "grid",
+    "instrument",
+    "minkowski",
+    "path",
+    "patterns",
+    "raster",
+    "rings",
+    "server",
+    "svg",
 )
+
+
+def __getattr__(name: str) -> ModuleType:
+    if name in _SUBMODULES:
+        return import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,24 +1,191 @@
 """Seamless geometric desktop background image generator."""
 
+from functools import partial
+from typing import TextIO
 import argparse
-import inspect
-import random
+import contextlib
+import json
+import os
+import sys
 
-from .svg import generate_svg
 from . import patterns
 
 
-PATTERNS = [name for name, _ in inspect.getmembers(patterns, inspect.ismodule)]
-
-
 def main() -> None:
-    """Parse CLI arguments and generate SVG of the target pattern."""
+    """Parse CLI arguments and generate SVG or PNG of the target pattern."""
     parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("pattern", choices=PATTERNS)
+    parser.add_argument("pattern", choices=patterns.PATTERNS)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=1,
+        help="seed of the tile colors (default: 1)",
+    )
+    parser.add_argument(
+        "--instancing",
+        action="store_true",
+        help="define the tile geometry once and instance it per tile",
+    )
+    parser.add_argument(
+        "--relative",
+        action="store_true",
+        help="compile the tile geometry once into relative path data",
+    )
+    parser.add_argument(
+        "--shared-edges",
+        action="store_true",
+        help=(
+            "stroke every edge once in a separate layer instead of stroking "
+            "each tile, at the cost of a larger file (SVG only)"
+        ),
+    )
+    parser.add_argument(
+        "--simplify",
+        nargs="?",
+        type=float,
+        const=0.0,
+        metavar="PIXELS",
+        help=(
+            "drop tile path points on straight lines, and optionally any "
+            "detail smaller than given number of output pixels"
+        ),
+    )
+    parser.add_argument(
+        "--decimals",
+        type=int,
+        # See `tilebg.svg.MAX_DECIMALS`
+        choices=range(16),
+        metavar="N",
+        help=(
+            "round SVG coordinates to given number of decimals from 0 to 15, "
+            "e.g. 0 for whole pixels (default: shortest exact "
+            "representation)"
+        ),
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="do not use the on-disk geometry cache",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="-",
+        metavar="JSON_PATH",
+        help=(
+            "print a summary of stage times and counters to standard error, "
+            "or dump them as JSON into given file"
+        ),
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help=(
+            "path of the output SVG file, gzip-compressed if the extension is "
+            "'.svgz', or PNG file if the extension is '.png' (default: SVG to "
+            "standard output)"
+        ),
+    )
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        default=6,
+        choices=range(10),
+        metavar="LEVEL",
+        help="compression level of SVGZ and PNG output, 0-9 (default: 6)",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="ratio of the PNG resolution to the nominal one (default: 1)",
+    )
+    parser.add_argument(
+        "--band-rows",
+        type=int,
+        help="height of PNG rendering bands (default: 256)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "number of processes rendering PNG bands, or generating SVG "
+            "tiles in chunks of rows, 0 for one per CPU (default: 1)"
+        ),
+    )
     args = parser.parse_args()
-    module = getattr(patterns, args.pattern)
-    random.seed(1)
-    print(generate_svg(**module.parameters()))
+    is_png = args.output is not None and args.output.endswith(".png")
+    if is_png and args.shared_edges:
+        parser.error("--shared-edges is not supported for PNG output")
+    if args.shared_edges and args.workers != 1:
+        parser.error("--shared-edges is not supported with multiple workers")
+
+    # Deferred imports keep the startup of the argument parsing fast
+    from . import instrument
+    from .cache import set_cache
+    from .raster import DEFAULT_BAND_ROWS, render_png
+    from .svg import open_svg, write_svg, write_svg_chunks
+
+    module = patterns.load(args.pattern)
+    if args.no_cache:
+        set_cache(None)
+    if args.profile is not None:
+        instrument.enable()
+    options = dict(
+        seed=args.seed,
+        # Rasterization relies on tiles sharing their geometry
+        instancing=args.instancing or is_png,
+        relative=args.relative,
+        simplify_tolerance=(
+            None if args.simplify is None else args.simplify / args.scale
+        ),
+        decimals=args.decimals,
+    )
+    with instrument.stage("geometry"):
+        parameters = module.parameters(
+            shared_edges=args.shared_edges, **options
+        )
+    if is_png:
+        with open(args.output, "wb") as png_file:
+            render_png(
+                png_file,
+                **parameters,
+                compress_level=args.compress_level,
+                scale=args.scale,
+                band_rows=args.band_rows or DEFAULT_BAND_ROWS,
+                workers=args.workers,
+            )
+    else:
+        with contextlib.ExitStack() as stack:
+            svg_file: TextIO
+            if args.output is None:
+                svg_file = sys.stdout
+            else:
+                svg_file = stack.enter_context(
+                    open_svg(args.output, compress_level=args.compress_level)
+                )
+            if args.workers == 1:
+                write_svg(svg_file, **parameters)
+            else:
+                workers = args.workers or os.cpu_count() or 1
+                write_svg_chunks(
+                    svg_file,
+                    author=parameters["author"],
+                    title=parameters["title"],
+                    resolution=parameters["resolution"],
+                    paths_fn=partial(
+                        patterns.grid_chunk, args.pattern, options
+                    ),
+                    chunk_count=4 * workers,
+                    workers=workers,
+                )
+            svg_file.write("\n")
+    if args.profile == "-":
+        print(instrument.summary(), file=sys.stderr)
+    elif args.profile is not None:
+        with open(args.profile, "w", encoding="utf-8") as profile_file:
+            json.dump(instrument.report(), profile_file, indent=2)
 
 
 main()
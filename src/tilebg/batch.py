@@ -0,0 +1,380 @@
+"""Batch generation of background images.
+
+A batch is a list of jobs, each rendering one pattern with a given seed,
+resolution and cell size into its own SVG or PNG file. Jobs are either read
+from a JSON manifest or formed as the cartesian product of the requested
+patterns, seeds, resolutions and cell sizes.
+
+The colors of the tiles are a hash of the seed of the job and the tile
+indices, so that results do not depend on the order or the process in which
+jobs are run. Jobs are run in a process pool. Tile geometry is built
+once per pattern and cell size in the parent process before the pool is
+started, so that workers inherit it (or at least find it in the on-disk
+geometry cache) instead of building it again. Moreover, SVG jobs differing in
+their seed only share their grid and SVG code, rewriting the classes of the
+tiles only, see `run_recolorings()`.
+
+Example:
+
+    python -m tilebg.batch --patterns hexagons gosperflakes2 --seeds 1 2 3 \\
+        --resolutions 1920x1200 3840x2160 --output-dir backgrounds
+
+"""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (c) 2024 ccornix"
+__license__ = "MIT"
+__all__ = [
+    "Job",
+    "load_manifest",
+    "product_jobs",
+    "run_batch",
+    "run_job",
+    "run_recolorings",
+]
+
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import product
+from pathlib import Path
+from typing import Any
+import argparse
+import contextlib
+import json
+import math
+import os
+
+from . import patterns
+from .raster import render_png
+from .grid import recolor
+from .svg import MAX_DECIMALS, SVGSkeleton, open_svg, write_svg
+
+
+DEFAULT_NAME_TEMPLATE = "{pattern}-{width}x{height}-{seed}.svg"
+
+
+@dataclass(frozen=True, kw_only=True)
+class Job:
+    """Parameters and output file of a single background image."""
+
+    pattern: str
+    seed: int = 1
+    resolution: tuple[int, int] = (1920, 1200)
+    cell_size: tuple[int, int] | None = None
+    output: Path
+    instancing: bool = False
+    relative: bool = False
+    shared_edges: bool = False
+    simplify_tolerance: float | None = None
+    decimals: int | None = None
+    scale: float = 1.0
+
+    def __post_init__(self) -> None:
+        if self.is_png and self.shared_edges:
+            raise ValueError("shared edges are not supported for PNG output")
+
+    @property
+    def is_png(self) -> bool:
+        """Return whether the job renders a PNG rather than an SVG."""
+        return self.output.suffix == ".png"
+
+    @property
+    def geometry_key(self) -> tuple[Any, ...] | None:
+        """Return what determines the SVG code of the job except for colors.
+
+        `None` is returned if the job cannot be recolored.
+        """
+        if self.is_png or self.instancing or self.shared_edges:
+            return None
+        return (
+            self.pattern,
+            self.resolution,
+            self.cell_size,
+            self.relative,
+            self.simplify_tolerance,
+            self.decimals,
+        )
+
+    def parameters(self, *, compact: bool = False) -> dict[str, Any]:
+        """Return the parameters of the image.
+
+        If `compact` is set, tiles are generated into an `SVGTileGrid`.
+        """
+        module = patterns.load(self.pattern)
+        grid_options: dict[str, Any] = dict(
+            relative=self.relative,
+            simplify_tolerance=self.simplify_tolerance,
+            decimals=self.decimals,
+        )
+        if compact:
+            grid_options.update(compact=True)
+        else:
+            grid_options.update(
+                # Rasterization relies on tiles sharing their geometry
+                instancing=self.instancing or self.is_png,
+                shared_edges=self.shared_edges,
+            )
+        parameters: dict[str, Any] = module.parameters(
+            resolution=self.resolution,
+            cell_size=self.cell_size or module.DEFAULT_CELL_SIZE,
+            seed=self.seed,
+            **grid_options,
+        )
+        return parameters
+
+
+def product_jobs(
+    *,
+    patterns: Iterable[str],
+    seeds: Iterable[int],
+    resolutions: Iterable[tuple[int, int]],
+    cell_sizes: Iterable[tuple[int, int] | None] = (None,),
+    output_dir: Path = Path("."),
+    name_template: str = DEFAULT_NAME_TEMPLATE,
+    **options: Any,
+) -> list[Job]:
+    """Return jobs for the cartesian product of the given parameters.
+
+    Output file names are formatted from `name_template`, with fields
+    `pattern`, `seed`, `width`, `height`, `cell_width` and `cell_height`
+    (empty for the default cell size). Further keyword arguments are passed
+    to every `Job`.
+    """
+    jobs = []
+    for pattern, seed, (width, height), cell_size in product(
+        patterns, seeds, resolutions, cell_sizes
+    ):
+        cell_width, cell_height = cell_size or ("", "")
+        name = name_template.format(
+            pattern=pattern,
+            seed=seed,
+            width=width,
+            height=height,
+            cell_width=cell_width,
+            cell_height=cell_height,
+        )
+        jobs.append(
+            Job(
+                pattern=pattern,
+                seed=seed,
+                resolution=(width, height),
+                cell_size=cell_size,
+                output=output_dir / name,
+                **options,
+            )
+        )
+    return jobs
+
+
+def load_manifest(path: Path) -> list[Job]:
+    """Return the jobs listed in a JSON manifest file.
+
+    The manifest is a list of objects with the fields of `Job`. Relative
+    output paths are resolved against the directory of the manifest.
+    """
+    with open(path, encoding="utf-8") as file:
+        entries: list[dict[str, Any]] = json.load(file)
+    jobs = []
+    for entry in entries:
+        entry = dict(entry)
+        entry["output"] = path.parent / entry["output"]
+        for key in ("resolution", "cell_size"):
+            if entry.get(key) is not None:
+                entry[key] = tuple(entry[key])
+        jobs.append(Job(**entry))
+    return jobs
+
+
+def run_job(job: Job) -> Path:
+    """Generate the image of a job and return the path of its output file."""
+    parameters = job.parameters()
+    job.output.parent.mkdir(parents=True, exist_ok=True)
+    if job.is_png:
+        with open(job.output, "wb") as file:
+            render_png(file, **parameters, scale=job.scale)
+    else:
+        with open_svg(job.output) as file:
+            write_svg(file, **parameters)
+            file.write("\n")
+    return job.output
+
+
+def run_recolorings(jobs: Sequence[Job]) -> list[Path]:
+    """Generate the images of SVG jobs differing in their seed only.
+
+    The grid and the SVG code are generated only once, for the first job. The
+    rest of the images are produced by rewriting the SVG classes of the tiles.
+    Return the paths of the output files.
+    """
+    assert len({job.geometry_key for job in jobs}) == 1
+    assert jobs[0].geometry_key is not None
+    module = patterns.load(jobs[0].pattern)
+    parameters = jobs[0].parameters(compact=True)
+    grid = parameters["paths"]
+    skeleton = SVGSkeleton.compile(**parameters)
+    for job in jobs:
+        recolored = recolor(grid, module.make_svg_class_fn(job.seed))
+        job.output.parent.mkdir(parents=True, exist_ok=True)
+        with open_svg(job.output) as file:
+            file.write(skeleton.format(recolored))
+            file.write("\n")
+    return [job.output for job in jobs]
+
+
+def run_batch(
+    jobs: Iterable[Job], *, workers: int | None = None
+) -> Iterator[Path]:
+    """Run `jobs` in a pool of `workers` processes (default: one per CPU).
+
+    Return an iterator over the output paths in the order of the jobs.
+    """
+    jobs = list(jobs)
+    _build_geometry(jobs)
+    tasks = _tasks(jobs, workers or os.cpu_count() or 1)
+    outputs: dict[int, Path] = {}
+    with contextlib.ExitStack() as stack:
+        if workers == 1:
+            results: Iterator[list[Path]] = map(
+                _run_task, [task for _, task in tasks]
+            )
+        else:
+            executor = stack.enter_context(ProcessPoolExecutor(workers))
+            results = executor.map(_run_task, [task for _, task in tasks])
+        next_index = 0
+        for (indices, _), paths in zip(tasks, results):
+            outputs.update(zip(indices, paths))
+            while next_index in outputs:
+                yield outputs.pop(next_index)
+                next_index += 1
+
+
+def _tasks(jobs: list[Job], workers: int) -> list[tuple[list[int], list[Job]]]:
+    """Return tasks of job indices and jobs for the workers.
+
+    Jobs that can be recolored from the same geometry are split into at most
+    `workers` tasks, while each of the rest of the jobs is a task of its own.
+    """
+    groups: dict[Any, list[int]] = {}
+    for i, job in enumerate(jobs):
+        key = job.geometry_key
+        groups.setdefault(i if key is None else key, []).append(i)
+    tasks = []
+    for indices in groups.values():
+        chunk_size = math.ceil(len(indices) / workers)
+        for start in range(0, len(indices), chunk_size):
+            chunk = indices[start:][:chunk_size]
+            tasks.append((chunk, [jobs[i] for i in chunk]))
+    return tasks
+
+
+def _run_task(jobs: list[Job]) -> list[Path]:
+    if len(jobs) == 1:
+        return [run_job(jobs[0])]
+    return run_recolorings(jobs)
+
+
+def _build_geometry(jobs: list[Job]) -> None:
+    """Build the tile geometry of each distinct pattern and cell size."""
+    for pattern, cell_size in dict.fromkeys(
+        (job.pattern, job.cell_size) for job in jobs
+    ):
+        module = patterns.load(pattern)
+        module.scaled_element_path(*(cell_size or module.DEFAULT_CELL_SIZE))
+
+
+def _parse_size(value: str) -> tuple[int, int]:
+    width, _, height = value.partition("x")
+    return int(width), int(height)
+
+
+def main() -> None:
+    """Parse CLI arguments and run a batch of jobs."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        help="JSON file listing the jobs, overriding the product options",
+    )
+    parser.add_argument(
+        "--patterns",
+        nargs="+",
+        choices=patterns.PATTERNS,
+        default=patterns.PATTERNS,
+    )
+    parser.add_argument("--seeds", nargs="+", type=int, default=[1])
+    parser.add_argument(
+        "--resolutions",
+        nargs="+",
+        type=_parse_size,
+        default=[(1920, 1200)],
+        metavar="WIDTHxHEIGHT",
+    )
+    parser.add_argument(
+        "--cell-sizes",
+        nargs="+",
+        type=_parse_size,
+        default=[None],
+        metavar="WIDTHxHEIGHT",
+        help="tile cell sizes (default: that of each pattern)",
+    )
+    parser.add_argument("--output-dir", type=Path, default=Path("."))
+    parser.add_argument(
+        "--name-template",
+        default=DEFAULT_NAME_TEMPLATE,
+        help=(
+            "output file name, formatted with fields pattern, seed, width, "
+            "height, cell_width and cell_height; a '.svgz' extension "
+            "compresses SVGs, while a '.png' extension renders PNGs "
+            f"(default: {DEFAULT_NAME_TEMPLATE})"
+        ),
+    )
+    parser.add_argument("--instancing", action="store_true")
+    parser.add_argument("--relative", action="store_true")
+    parser.add_argument("--shared-edges", action="store_true")
+    parser.add_argument(
+        "--simplify",
+        nargs="?",
+        type=float,
+        const=0.0,
+        metavar="TOLERANCE",
+        help="simplify tile paths, see `tilebg.path.simplify()`",
+    )
+    parser.add_argument(
+        "--decimals",
+        type=int,
+        choices=range(MAX_DECIMALS + 1),
+        metavar="N",
+        help="round SVG coordinates, see `tilebg.svg.format_points()`",
+    )
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="number of processes, 0 for one per CPU (default: 0)",
+    )
+    args = parser.parse_args()
+    if args.manifest is not None:
+        jobs = load_manifest(args.manifest)
+    else:
+        jobs = product_jobs(
+            patterns=args.patterns,
+            seeds=args.seeds,
+            resolutions=args.resolutions,
+            cell_sizes=args.cell_sizes,
+            output_dir=args.output_dir,
+            name_template=args.name_template,
+            instancing=args.instancing,
+            relative=args.relative,
+            shared_edges=args.shared_edges,
+            simplify_tolerance=args.simplify,
+            decimals=args.decimals,
+            scale=args.scale,
+        )
+    for path in run_batch(jobs, workers=args.workers or None):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Persistent on-disk cache of precomputed fractal island geometry.
+
+Islands are stored exactly as `.npy` arrays of the int64 numerators of their
+`RingPath`, preceded by a row holding the denominator, which are memory-mapped
+on load. Entries are keyed by rule name, number of iterations
+and library version. Entries of other versions are invalidated, and the least
+recently used entries are evicted once the cache exceeds its size cap.
+
+"""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (c) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["GeometryCache", "cached_island", "get_cache", "set_cache"]
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from importlib.metadata import PackageNotFoundError, version
+from numpy.typing import NDArray
+from pathlib import Path
+from typing import Any
+import contextlib
+import numpy as np
+import os
+import tempfile
+
+from .gosper import gosper_ring_island
+from .minkowski import minkowski_ring_island
+from .instrument import count
+from .rings import EISENSTEIN, GAUSSIAN, Ring, RingPath, TIntArray
+
+# Bump whenever the geometry of existing rules changes without a new release
+CACHE_FORMAT = 3
+
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+ISLAND_BUILDERS: dict[str, tuple[Ring, Callable[[int], RingPath]]] = {
+    "gosper": (EISENSTEIN, gosper_ring_island),
+    "minkowski": (GAUSSIAN, minkowski_ring_island),
+}
+
+
+def _library_version() -> str:
+    try:
+        library_version = version("tilebg")
+    except PackageNotFoundError:
+        library_version = "unknown"
+    return f"{library_version}-{CACHE_FORMAT}"
+
+
+def _default_directory() -> Path:
+    try:
+        return Path(os.environ["TILEBG_CACHE_DIR"])
+    except KeyError:
+        cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        return Path(cache_home) / "tilebg"
+
+
+@dataclass(kw_only=True)
+class GeometryCache:
+    """Directory of precomputed arrays with a total size cap."""
+
+    directory: Path
+    max_bytes: int = DEFAULT_MAX_BYTES
+    version: str = _library_version()
+
+    def get_or_build(
+        self,
+        name: str,
+        iterations: int,
+        build: Callable[[int], NDArray[Any]],
+    ) -> NDArray[Any]:
+        """Return the cached array of `name`, calling `build` on a miss."""
+        path = self._entry_path(name, iterations)
+        try:
+            array: NDArray[Any] = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            count("cache_misses")
+            array = np.asarray(build(iterations))
+            self._store(path, array)
+        else:
+            count("cache_hits")
+            with contextlib.suppress(OSError):
+                os.utime(path)
+        return array
+
+    def clear(self) -> None:
+        """Remove every cache entry."""
+        for path in self._entries():
+            path.unlink(missing_ok=True)
+
+    def _entry_path(self, name: str, iterations: int) -> Path:
+        return self.directory / f"{name}-{iterations}@{self.version}.npy"
+
+    def _entries(self) -> list[Path]:
+        return list(self.directory.glob("*.npy"))
+
+    def _store(self, path: Path, array: NDArray[Any]) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            file = tempfile.NamedTemporaryFile(
+                dir=self.directory, suffix=".tmp", delete=False
+            )
+            try:
+                with file:
+                    np.save(file, array)
+                os.replace(file.name, path)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.unlink(file.name)
+                raise
+            self._evict()
+        except OSError:
+            # The cache is an optimization only, never fail because of it
+            pass
+
+    def _evict(self) -> None:
+        """Remove stale entries, then the least recently used ones."""
+        suffix = f"@{self.version}.npy"
+        entries = []
+        for path in self._entries():
+            if path.name.endswith(suffix):
+                stat = path.stat()
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+            else:
+                path.unlink(missing_ok=True)
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+
+
+_cache: GeometryCache | None = GeometryCache(directory=_default_directory())
+
+
+def get_cache() -> GeometryCache | None:
+    """Return the global geometry cache, if enabled."""
+    return _cache
+
+
+def set_cache(cache: GeometryCache | None) -> None:
+    """Set the global geometry cache, or disable caching with `None`."""
+    global _cache
+    _cache = cache
+
+
+def cached_island(name: str, iterations: int) -> RingPath:
+    """Return island `name` after `iterations` through the global cache.
+
+    Islands are cached exactly, so that they can still be scaled exactly
+    before conversion to float64 path points, see `RingPath.as_array()`.
+    """
+    ring, build = ISLAND_BUILDERS[name]
+    if _cache is None:
+        return build(iterations)
+
+    def build_entry(iterations: int) -> TIntArray:
+        island = build(iterations)
+        return np.vstack(([[island.denominator, 0]], island.numerators))
+
+    entry = _cache.get_or_build(name, iterations, build_entry)
+    return RingPath(ring, entry[1:], int(entry[0, 0]))
@@ -7,16 +7,118 @@ Extension of the `functools` module of the Python Standard Library.
 __author__ = "ccornix"
 __copyright__ = "Copyright (c) 2024 ccornix"
 __license__ = "MIT"
-__all__ = ["repeated"]
+__all__ = [
+    "clear_memoized",
+    "memoization_stats",
+    "memoized",
+    "ordered_map",
+    "repeated",
+]
 
-from collections.abc import Callable
-from functools import reduce
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import _CacheInfo, lru_cache, reduce, wraps
+from typing import Any, TypeVar
+import numpy as np
 
+F = TypeVar("F", bound=Callable[..., Any])
+T = TypeVar("T")
+R = TypeVar("R")
 
-def repeated(f: Callable, n: int, *args) -> Callable:
+_memoized_functions: dict[str, Any] = {}
+
+
+def repeated(f: Callable[..., T], n: int, *args: Any) -> Callable[[T], T]:
     """Return a function that apply a callable `f` `n`-times."""
 
-    def repfunc(x):
+    def repfunc(x: T) -> T:
         return reduce(lambda y, _: f(y, *args), range(n), x)
 
     return repfunc
+
+
+def memoized(maxsize: int = 128) -> Callable[[F], F]:
+    """Return a decorator for bounded LRU memoization of a pure function.
+
+    Cached results are frozen so that callers cannot alter them: arrays become
+    read-only and sympy matrices immutable, also within lists and tuples,
+    while lists are copied on every call. Hit and miss statistics are
+    available through `memoization_stats()`.
+    """
+
+    def decorator(f: F) -> F:
+        cached = lru_cache(maxsize)(lambda *a, **kw: _freeze(f(*a, **kw)))
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            return _thaw(cached(*args, **kwargs))
+
+        wrapper.cache_info = cached.cache_info  # type: ignore[attr-defined]
+        wrapper.cache_clear = cached.cache_clear  # type: ignore[attr-defined]
+        _memoized_functions[f"{f.__module__}.{f.__qualname__}"] = cached
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def memoization_stats() -> dict[str, _CacheInfo]:
+    """Return hit and miss statistics of every memoized function."""
+    return {
+        name: cached.cache_info()
+        for name, cached in _memoized_functions.items()
+    }
+
+
+def clear_memoized() -> None:
+    """Clear the caches of every memoized function."""
+    for cached in _memoized_functions.values():
+        cached.cache_clear()
+
+
+def ordered_map(
+    f: Callable[[T], R], items: Iterable[T], *, workers: int = 1
+) -> Iterator[R]:
+    """Return an iterator over the results of `f` applied to `items`.
+
+    With more than one `workers`, `f` is applied in a pool of processes, but
+    results are still returned in order as soon as they are ready, keeping at
+    most two items per worker in flight.
+    """
+    if workers == 1:
+        yield from map(f, items)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        pending: deque[Future[R]] = deque()
+        for item in items:
+            pending.append(executor.submit(f, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _FrozenList(tuple):
+    """Frozen list, told apart from tuples returned as such."""
+
+
+def _freeze(obj: Any) -> Any:
+    if isinstance(obj, np.ndarray):
+        obj = obj.copy()
+        obj.flags.writeable = False
+        return obj
+    if isinstance(obj, list):
+        return _FrozenList(_freeze(item) for item in obj)
+    if type(obj) is tuple:
+        return tuple(_freeze(item) for item in obj)
+    if hasattr(obj, "as_immutable"):
+        return obj.as_immutable()
+    return obj
+
+
+def _thaw(obj: Any) -> Any:
+    if isinstance(obj, _FrozenList):
+        return [_thaw(item) for item in obj]
+    if type(obj) is tuple:
+        return tuple(_thaw(item) for item in obj)
+    return obj
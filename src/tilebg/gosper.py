@@ -3,42 +3,105 @@
 __author__ = "ccornix"
 __copyright__ = "Copyright (c) 2024 ccornix"
 __license__ = "MIT"
-__all__ = ["gosper_island"]
+__all__ = ["gosper_island", "gosper_ring_island"]
 
-from sympy import Matrix, Rational, pi, sqrt
+from typing import TYPE_CHECKING
+import numpy as np
 
-from .functools import repeated
+from .functools import memoized, repeated
 from .path import (
+    TBackend,
+    TPath,
+    as_array,
+    batch_refined_segments,
+    get_backend,
     points_to_segments,
     segments_to_points,
     refined_segments,
     regular_polygon_path,
     rotation_matrix,
+    transform_stack,
 )
+from .rings import EISENSTEIN, RingPath
 
-R_m60 = rotation_matrix(-pi / 3)
+if TYPE_CHECKING:
+    from sympy import Matrix
 
-# Transformation: scale edge by 1/sqrt(7) and rotate counter-clockwise by
-# arcsin(sqrt(3)/(2*sqrt(7)))
-T_gosper = Rational(1, 14) * Matrix([[5, -sqrt(3)], [sqrt(3), 5]])
 
+@memoized()
+def _rule_matrices() -> tuple["Matrix", "Matrix"]:
+    """Return the exact transformations of the Gosper island rule."""
+    from sympy import Matrix, Rational, pi, sqrt
 
-def gosper_rule(segment: Matrix) -> list[Matrix]:
+    # Transformation: scale edge by 1/sqrt(7) and rotate counter-clockwise by
+    # arcsin(sqrt(3)/(2*sqrt(7)))
+    T_gosper = Rational(1, 14) * Matrix([[5, -sqrt(3)], [sqrt(3), 5]])
+    R_m60 = rotation_matrix(-pi / 3, backend="sympy")
+    return T_gosper, R_m60
+
+
+def gosper_rule(segment: "Matrix") -> list["Matrix"]:
     """Refine a `segment` vector following the Gosper island rule.
 
     Reference:
     https://larryriddle.agnesscott.org/ifs/ksnow/flowsnake.htm
     """
+    T_gosper, R_m60 = _rule_matrices()
     v1 = T_gosper * segment
     v2 = R_m60 * v1
     return [v1, v2, v1]
 
 
-def gosper_island(iterations: int) -> list[Matrix]:
-    """Return Gosper island after a given number of `iterations`."""
-    points = regular_polygon_path(6)
-    segments = points_to_segments(points)
+# Linear transforms of the numeric rule, equivalent to `gosper_rule()`, built
+# without sympy
+_T = np.array([[5, -np.sqrt(3)], [np.sqrt(3), 5]]) / 14
+_R_m60 = np.array([[1, np.sqrt(3)], [-np.sqrt(3), 1]]) / 2
+GOSPER_TRANSFORMS = transform_stack([_T, _R_m60 @ _T, _T])
+
+# Multipliers and divisor of the exact rule in the Eisenstein integers,
+# equivalent to `gosper_rule()`: T_gosper is `(3 + w) / 7` and R_m60 is `-w`
+GOSPER_MULTIPLIERS = ((3, 1), (1, -2), (3, 1))
+GOSPER_DIVISOR = 7
+
+
+def gosper_island(
+    iterations: int, *, backend: TBackend | None = None
+) -> TPath:
+    """Return Gosper island after a given number of `iterations`.
+
+    With the numeric `backend`, all segments of a refinement level are
+    expanded in a single array operation.
+    """
+    return _gosper_island(iterations, backend or get_backend())
+
+
+@memoized()
+def _gosper_island(iterations: int, backend: TBackend) -> TPath:
+    if backend == "numpy":
+        points = regular_polygon_path(6, backend="numpy")
+        refined = repeated(
+            batch_refined_segments, iterations, GOSPER_TRANSFORMS
+        )(as_array(points_to_segments(points)))
+        return segments_to_points(refined, points[0])
+    points = regular_polygon_path(6, backend="sympy")
+    segments = points_to_segments(points, backend="sympy")
     return segments_to_points(
         list(repeated(refined_segments, iterations, gosper_rule)(segments)),
         points[0],
+        backend="sympy",
     )
+
+
+def gosper_ring_island(iterations: int) -> RingPath:
+    """Return Gosper island after a given number of `iterations`.
+
+    The island is derived exactly in the Eisenstein integers, see
+    `RingPath`.
+    """
+    # Vertices of `regular_polygon_path(6)`, rotated clockwise by -w
+    polygon = RingPath.polygon(EISENSTEIN, (0, -1), 6)
+    path = repeated(
+        RingPath.refined, iterations, GOSPER_MULTIPLIERS, GOSPER_DIVISOR
+    )(polygon)
+    assert path.is_closed()
+    return path
@@ -4,83 +4,431 @@ __author__ = "ccornix"
 __copyright__ = "Copyright (C) 2024 ccornix"
 __license__ = "MIT"
 __all__ = [
+    "generate_compact_grid",
     "generate_grid",
+    "iter_grid",
     "make_odd_row_shift_offsets_fn",
+    "make_hashed_fill_svg_class_fn",
     "make_random_fill_svg_class_fn",
+    "recolor",
 ]
 
-from collections.abc import Callable, Sequence
-from random import randrange
-from sympy import Matrix
+from collections.abc import Callable, Iterator
+from dataclasses import replace
+from random import Random, randrange
 from typing import cast
+import math
+import numpy as np
 import operator
 
-from .path import TNum, shift
-from .svg import SVGPath
+from .instrument import count
+from .path import (
+    TArray,
+    TNum,
+    TPath,
+    as_array,
+    common_denominators,
+    edge_keys,
+    shift,
+    simplify,
+    simplify_tile,
+)
+from .svg import (
+    SVGElement,
+    SVGPath,
+    SVGPathTemplate,
+    SVGPolylines,
+    SVGTile,
+    SVGTileGrid,
+    SVGUse,
+)
+
+# SVG class of stroked tiles
+STROKE_CLASS = "stroke"
+
+_MASK64 = 2**64 - 1
+_GOLDEN_GAMMA = 0x9E3779B97F4A7C15
 
 
 def generate_grid(
     *,
-    element_path: Sequence[Matrix],
+    element_path: TPath,
     spacings: tuple[int, int],
     resolution: tuple[int, int],
     offsets_fn: Callable[[int, int], tuple[TNum, TNum]] | None,
     svg_class_fn: Callable[[int, int], list[str]],
-) -> list[SVGPath]:
+    instancing: bool = False,
+    relative: bool = False,
+    simplify_tolerance: float | None = None,
+    shared_edges: bool = False,
+    row_chunk: tuple[int, int] | None = None,
+    decimals: int | None = None,
+) -> list[SVGElement]:
     """Generate a whole grid of SVG paths.
 
+    See `iter_grid()` for the description of the arguments, whose tiles are
+    collected into a list.
+    """
+    return list(
+        iter_grid(
+            element_path=element_path,
+            spacings=spacings,
+            resolution=resolution,
+            offsets_fn=offsets_fn,
+            svg_class_fn=svg_class_fn,
+            instancing=instancing,
+            relative=relative,
+            simplify_tolerance=simplify_tolerance,
+            shared_edges=shared_edges,
+            row_chunk=row_chunk,
+            decimals=decimals,
+        )
+    )
+
+
+def iter_grid(
+    *,
+    element_path: TPath,
+    spacings: tuple[int, int],
+    resolution: tuple[int, int],
+    offsets_fn: Callable[[int, int], tuple[TNum, TNum]] | None,
+    svg_class_fn: Callable[[int, int], list[str]],
+    instancing: bool = False,
+    relative: bool = False,
+    simplify_tolerance: float | None = None,
+    shared_edges: bool = False,
+    row_chunk: tuple[int, int] | None = None,
+    decimals: int | None = None,
+) -> Iterator[SVGElement]:
+    """Lazily generate a whole grid of SVG paths in row order.
+
     The path for a single element in the grid is passed through `element_path`,
     which is then cloned and layed out with given `spacings`. Function
     `offests_fn` may define an index-dependent offset, which can be used, for
     instance, to define a hexagonal grid with alternating horizontal row
-    offsets. The `resolution` of the target image is used to estimate how many
-    times elements needs to be repeated in the horizontal and vertical
-    directions. Finally, `svg_class_fn` should yield an index-dependent SVG
+    offsets. Only the elements whose bounding box intersects the target image
+    of given `resolution` are generated, including those wrapping around its
+    edges. Finally, `svg_class_fn` should yield an index-dependent SVG
     class for the path of the element.
 
-    A list of SVG path data is returned.
+    An iterator over SVG path data is returned, computing the offsets and
+    class of each tile only when it is consumed. If `instancing` is set, the
+    element path is shared by SVG use elements that store the tile offsets
+    only. Otherwise, if `relative` is set, tiles share the element path
+    compiled into relative path data, see `SVGPathTemplate`.
+
+    Unless `simplify_tolerance` is `None`, the element path is simplified
+    once before being replicated, see `simplify()`. With a positive
+    tolerance, edges shared by adjacent tiles are simplified alike, so that
+    the tiles still fit, see `simplify_tile()`.
+
+    If `shared_edges` is set, tiles are not stroked themselves. Instead, after
+    all tiles, a single stroke path is yielded that contains every distinct
+    edge of the tiling once, even if it is shared by adjacent tiles.
+
+    If `row_chunk` is given as a pair `(i, n)`, the rows of the lattice are
+    split into `n` contiguous chunks of nearly equal size, and only the tiles
+    of chunk `i` are generated. Since the class of a tile only depends on its
+    periodic cell, chunks generated separately from the same arguments
+    concatenate into the whole grid. This is not supported with
+    `shared_edges`, whose stroke path depends on every tile.
+
+    Unless `decimals` is `None`, coordinates are serialized rounded to given
+    number of decimals, see `format_points()`. Numeric coordinates that are
+    fractions of small denominators are shifted exactly, see `shift()`.
+    """
+    assert not (shared_edges and row_chunk is not None)
+    if simplify_tolerance is not None:
+        element_path = _simplified(
+            element_path, simplify_tolerance, spacings, offsets_fn
+        )
+    denominators = common_denominators(element_path)
+    element = SVGPath(
+        points=element_path, svg_class=[], id="element", decimals=decimals
+    )
+    template = (
+        SVGPathTemplate.compile(element_path, decimals) if relative else None
+    )
+    svg_class_index: dict[tuple[str, ...], int] = {}
+    svg_classes: list[tuple[str, ...]] = []
+    point_count = len(element_path)
+    tile_offsets: list[tuple[TNum, TNum]] = []
+    for _, offsets, svg_class in _iter_cells(
+        element_path=element_path,
+        spacings=spacings,
+        resolution=resolution,
+        offsets_fn=offsets_fn,
+        svg_class_fn=svg_class_fn,
+        row_chunk=row_chunk,
+    ):
+        if shared_edges:
+            tile_offsets.append(offsets)
+            svg_class = [c for c in svg_class if c != STROKE_CLASS]
+        count("tiles")
+        count("points", point_count)
+        if instancing:
+            yield SVGUse(
+                element=element,
+                offsets=offsets,
+                svg_class=svg_class,
+                decimals=decimals,
+            )
+        elif template is not None:
+            key = tuple(svg_class)
+            if key not in svg_class_index:
+                svg_class_index[key] = len(svg_classes)
+                svg_classes.append(key)
+            yield SVGTile(
+                element_path=element_path,
+                offsets=offsets,
+                class_index=svg_class_index[key],
+                svg_classes=svg_classes,
+                template=template,
+                decimals=decimals,
+                denominators=denominators,
+            )
+        else:
+            yield SVGPath(
+                points=shift(element_path, offsets, denominators=denominators),
+                svg_class=svg_class,
+                decimals=decimals,
+            )
+    if shared_edges:
+        polylines = _shared_edge_polylines(element_path, tile_offsets)
+        count("edge_runs", len(polylines))
+        yield SVGPolylines(
+            polylines=polylines, svg_class=[STROKE_CLASS], decimals=decimals
+        )
+
+
+def generate_compact_grid(
+    *,
+    element_path: TPath,
+    spacings: tuple[int, int],
+    resolution: tuple[int, int],
+    offsets_fn: Callable[[int, int], tuple[TNum, TNum]] | None,
+    svg_class_fn: Callable[[int, int], list[str]],
+    relative: bool = False,
+    simplify_tolerance: float | None = None,
+    decimals: int | None = None,
+) -> SVGTileGrid:
+    """Generate a whole grid of tiles sharing the geometry of their element.
+
+    See `iter_grid()` for the description of the arguments. Instead of copies
+    of the element path, only the offsets of the tiles and an index into the
+    set of distinct SVG classes are stored in arrays, along with the indices
+    of the periodic cells of the tiles for `recolor()`. If `relative` is set,
+    tiles are serialized through the element path compiled into relative path
+    data. Coordinates are serialized rounded to `decimals`.
+    """
+    if simplify_tolerance is not None:
+        element_path = _simplified(
+            element_path, simplify_tolerance, spacings, offsets_fn
+        )
+    offsets_list: list[tuple[float, float]] = []
+    cells: list[tuple[int, int]] = []
+    class_indices: list[int] = []
+    svg_class_index: dict[tuple[str, ...], int] = {}
+    for cell, (x, y), svg_class in _iter_cells(
+        element_path=element_path,
+        spacings=spacings,
+        resolution=resolution,
+        offsets_fn=offsets_fn,
+        svg_class_fn=svg_class_fn,
+    ):
+        offsets_list.append((float(x), float(y)))
+        cells.append(cell)
+        class_indices.append(
+            svg_class_index.setdefault(tuple(svg_class), len(svg_class_index))
+        )
+    return SVGTileGrid(
+        element_path=element_path,
+        offsets=np.array(offsets_list, dtype=np.float64).reshape(-1, 2),
+        class_indices=np.array(
+            class_indices,
+            dtype=np.min_scalar_type(max(len(svg_class_index) - 1, 0)),
+        ),
+        svg_classes=list(svg_class_index),
+        template=(
+            SVGPathTemplate.compile(element_path, decimals)
+            if relative
+            else None
+        ),
+        cells=np.array(cells, dtype=np.int64).reshape(-1, 2),
+        periods=_periods(spacings, resolution),
+        decimals=decimals,
+        denominators=common_denominators(element_path),
+    )
+
+
+def recolor(
+    grid: SVGTileGrid, svg_class_fn: Callable[[int, int], list[str]]
+) -> SVGTileGrid:
+    """Return a compact grid with the SVG classes of the tiles redrawn.
+
+    Only the class assignments of `grid` are recomputed by `svg_class_fn`,
+    while its geometry is shared. Classes are drawn for the periodic cells in
+    the same order as by the grid generators, so that the result equals the
+    grid generated from scratch with `svg_class_fn`, including its seamless
+    wrap-around.
+    """
+    assert grid.cells is not None and grid.periods is not None
+    Nx, Ny = grid.periods
+    svg_class_index: dict[tuple[str, ...], int] = {}
+    periodic_class_indices = np.array(
+        [
+            svg_class_index.setdefault(
+                tuple(svg_class_fn(jx, jy)), len(svg_class_index)
+            )
+            for jy in range(Ny)
+            for jx in range(Nx)
+        ]
+    )
+    class_indices = periodic_class_indices[
+        grid.cells[:, 1] * Nx + grid.cells[:, 0]
+    ]
+    return replace(
+        grid,
+        class_indices=class_indices.astype(
+            np.min_scalar_type(max(len(svg_class_index) - 1, 0))
+        ),
+        svg_classes=list(svg_class_index),
+    )
+
+
+def _shared_edge_polylines(
+    element_path: TPath, offsets: list[tuple[TNum, TNum]]
+) -> list[TArray]:
+    """Return runs of the edges of shifted copies of a path, each edge once.
+
+    Edges are visited tile by tile in path order, and consecutive edges not
+    visited before are joined into a polyline.
+    """
+    points = as_array(element_path)
+    tiles = np.array(offsets, dtype=np.float64)[:, None] + points
+    starts, ends = tiles[:, :-1].reshape(-1, 2), tiles[:, 1:].reshape(-1, 2)
+    _, first_indices = np.unique(
+        edge_keys(starts, ends), axis=0, return_index=True
+    )
+    is_first = np.zeros(len(starts), dtype=np.int8)
+    is_first[first_indices] = 1
+    polylines = []
+    for tile, tile_is_first in zip(tiles, is_first.reshape(len(tiles), -1)):
+        # Boundaries of runs of first edges alternate between starts and stops
+        bounds = np.flatnonzero(np.diff(tile_is_first, prepend=0, append=0))
+        for start, stop in bounds.reshape(-1, 2).tolist():
+            polylines.append(tile[slice(start, stop + 1)])
+    return polylines
+
+
+def _simplified(
+    element_path: TPath,
+    tolerance: float,
+    spacings: tuple[int, int],
+    offsets_fn: Callable[[int, int], tuple[TNum, TNum]] | None,
+) -> TPath:
+    """Return the element path simplified consistently with the lattice."""
+    if tolerance == 0:
+        return simplify(element_path)
+    dx, dy = spacings
+    offsets_fn = offsets_fn or (lambda ix, iy: (0, 0))
+    x0, y0 = offsets_fn(0, 0)
+    # Translations to the cells around the origin, including every neighbor
+    translations = [
+        (float(x - x0) + ix * dx, float(y - y0) + iy * dy)
+        for iy in range(-3, 4)
+        for ix in range(-3, 4)
+        if (ix, iy) != (0, 0)
+        for x, y in [offsets_fn(ix, iy)]
+    ]
+    return simplify_tile(element_path, tolerance, translations)
+
+
+def _iter_cells(
+    *,
+    element_path: TPath,
+    spacings: tuple[int, int],
+    resolution: tuple[int, int],
+    offsets_fn: Callable[[int, int], tuple[TNum, TNum]] | None,
+    svg_class_fn: Callable[[int, int], list[str]],
+    row_chunk: tuple[int, int] | None = None,
+) -> Iterator[tuple[tuple[int, int], tuple[TNum, TNum], list[str]]]:
+    """Lazily generate the visible cells in row order.
+
+    For each cell, the indices of its periodic cell, its offsets and its SVG
+    class are generated. Cells are limited to a chunk of rows if `row_chunk`
+    is given, see `iter_grid()`.
+
+    Exactly the cells are generated whose copy of the bounding box of the
+    element path intersects the image, assuming that `offsets_fn` shifts
+    cells by less than one spacing. Cells are colored periodically, so that
+    cells wrapping around the image have the class of their counterpart.
     """
     dx, dy = spacings
     w, h = resolution
-    assert w % dx == 0 and h % dy == 0
-    Nx, Ny = w // dx, h // dy
+    Nx, Ny = _periods(spacings, resolution)
 
     offsets_fn = offsets_fn or (lambda ix, iy: (0, 0))
 
-    edge_svg_class_cache: dict[tuple[int, int], list[str]] = {}
-
-    def wrapped_svg_class(ix: int, iy: int) -> list[str]:
-        jx = ix % Nx
-        jy = iy % Ny
-        try:
-            svg_class = edge_svg_class_cache[jx, jy]
-        except KeyError:
-            svg_class = svg_class_fn(jx, jy)
-            if jx == 0 or jy == 0:
-                edge_svg_class_cache[jx, jy] = svg_class
-        return svg_class
-
-    return [
-        SVGPath(
-            points=shift(
-                element_path,
-                # HACK: https://github.com/python/mypy/issues/7509
-                cast(
-                    tuple[TNum, TNum],
-                    tuple(
-                        map(
-                            operator.add,
-                            offsets_fn(ix, iy),
-                            (ix * dx, iy * dy),
-                        )
-                    ),
+    # Bounding box of the element path, computed once
+    points = as_array(element_path)
+    x_min, y_min = points.min(axis=0).tolist()
+    x_max, y_max = points.max(axis=0).tolist()
+
+    # Classes are drawn in row order of the periodic cells on first use, so
+    # that they do not depend on which cells happen to be visible
+    svg_class_cache: dict[tuple[int, int], list[str]] = {}
+    periodic_cells = ((jx, jy) for jy in range(Ny) for jx in range(Nx))
+
+    def periodic_svg_class(cell: tuple[int, int]) -> list[str]:
+        while cell not in svg_class_cache:
+            jx, jy = next(periodic_cells)
+            svg_class_cache[jx, jy] = svg_class_fn(jx, jy)
+        return svg_class_cache[cell]
+
+    # Candidate cells, with a margin of one cell for the shifts of offsets_fn
+    ix_range = range(
+        math.floor(-x_max / dx) - 1, math.ceil((w - x_min) / dx) + 1
+    )
+    iy_range = range(
+        math.floor(-y_max / dy) - 1, math.ceil((h - y_min) / dy) + 1
+    )
+    if row_chunk is not None:
+        i, n = row_chunk
+        assert 0 <= i < n
+        start, stop = (len(iy_range) * k // n for k in (i, i + 1))
+        iy_range = iy_range[start:stop]
+    for iy in iy_range:
+        for ix in ix_range:
+            # HACK: https://github.com/python/mypy/issues/7509
+            offsets = cast(
+                tuple[TNum, TNum],
+                tuple(
+                    map(operator.add, offsets_fn(ix, iy), (ix * dx, iy * dy))
                 ),
-            ),
-            svg_class=wrapped_svg_class(ix, iy),
+            )
+            x, y = float(offsets[0]), float(offsets[1])
+            if (
+                x + x_min < w
+                and x + x_max > 0
+                and y + y_min < h
+                and y + y_max > 0
+            ):
+                cell = (ix % Nx, iy % Ny)
+                yield cell, offsets, periodic_svg_class(cell)
+
+
+def _periods(
+    spacings: tuple[int, int], resolution: tuple[int, int]
+) -> tuple[int, int]:
+    """Return the number of cells after which the grid repeats itself."""
+    dx, dy = spacings
+    w, h = resolution
+    if w % dx or h % dy:
+        raise ValueError(
+            f"resolution {w}x{h} is not a multiple of the spacings {dx}x{dy}"
         )
-        for iy in range(Ny + 1)
-        for ix in range(Nx + 1)
-    ]
+    return w // dx, h // dy
 
 
 def make_odd_row_shift_offsets_fn(
@@ -97,13 +445,47 @@ def make_odd_row_shift_offsets_fn(
 
 
 def make_random_fill_svg_class_fn(
-    fill_count: int
+    fill_count: int, rng: Random | None = None
 ) -> Callable[[int, int], list[str]]:
-    """Make an SVG class factory function for a path."""
+    """Make an SVG class factory function for a path.
+
+    Fill styles are drawn from random number generator `rng`, or from the
+    global one of module `random` if omitted.
+    """
     assert fill_count > 0
+    _randrange = randrange if rng is None else rng.randrange
 
     def svg_class_fn(ix: int, iy: int) -> list[str]:
         """Return SVG path class with a randomly selected fill style."""
-        return ["stroke", f"fill-{randrange(fill_count)}"]
+        return ["stroke", f"fill-{_randrange(fill_count)}"]
 
     return svg_class_fn
+
+
+def make_hashed_fill_svg_class_fn(
+    fill_count: int, seed: int = 0
+) -> Callable[[int, int], list[str]]:
+    """Make an SVG class factory function for a path.
+
+    Unlike with `make_random_fill_svg_class_fn()`, the fill style of each
+    tile is a pure function of `seed` and the tile indices, so that tiles can
+    be colored in any order, by any process.
+    """
+    assert fill_count > 0
+    key = _mix64(seed & _MASK64)
+
+    def svg_class_fn(ix: int, iy: int) -> list[str]:
+        """Return SVG path class with a fill style hashed from the indices."""
+        counter = (iy & 0xFFFFFFFF) << 32 | (ix & 0xFFFFFFFF)
+        h = _mix64((key + counter * _GOLDEN_GAMMA) & _MASK64)
+        # Map the hash to range(fill_count) by its most significant bits
+        return ["stroke", f"fill-{(h * fill_count) >> 64}"]
+
+    return svg_class_fn
+
+
+def _mix64(x: int) -> int:
+    """Return the SplitMix64 finalizer of a 64-bit unsigned integer."""
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
@@ -0,0 +1,148 @@
+"""Lightweight instrumentation of the generation stages.
+
+Library stages report wall time and counters (e.g., tiles, points, bytes
+emitted and cache hits) into a global registry. Instrumentation is disabled by
+default, in which case reporting reduces to a flag check and iterators are
+passed through untouched.
+
+Stage times are exclusive: time spent in a nested stage, e.g., in the lazy
+grid generation consumed by the SVG serialization, is only accounted to the
+innermost stage.
+
+"""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (c) 2024 ccornix"
+__license__ = "MIT"
+__all__ = [
+    "count",
+    "disable",
+    "enable",
+    "is_enabled",
+    "report",
+    "reset",
+    "stage",
+    "summary",
+    "timed_iter",
+]
+
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import Any, TypeVar
+import time
+
+from .functools import memoization_stats
+
+T = TypeVar("T")
+
+_enabled = False
+_seconds: defaultdict[str, float] = defaultdict(float)
+_counters: Counter[str] = Counter()
+_active_stages: list[tuple[str, float]] = []
+
+
+def enable() -> None:
+    """Enable instrumentation."""
+    global _enabled
+    _enabled = True
+
+
+def disable() -> None:
+    """Disable instrumentation."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    """Return whether instrumentation is enabled."""
+    return _enabled
+
+
+def reset() -> None:
+    """Reset all stage times and counters."""
+    _seconds.clear()
+    _counters.clear()
+    _active_stages.clear()
+
+
+def count(name: str, n: int = 1) -> None:
+    """Increment counter `name` by `n`."""
+    if _enabled:
+        _counters[name] += n
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Return a context manager accounting its wall time to stage `name`."""
+    if not _enabled:
+        yield
+        return
+    _start(name)
+    try:
+        yield
+    finally:
+        _stop()
+
+
+def timed_iter(name: str, iterable: Iterable[T]) -> Iterable[T]:
+    """Return `iterable` accounting the time of producing items to `name`."""
+    if not _enabled:
+        return iterable
+    return _timed_iter(name, iter(iterable))
+
+
+def report() -> dict[str, Any]:
+    """Return stage times, counters and memoization statistics."""
+    return dict(
+        seconds=dict(_seconds),
+        counters=dict(_counters),
+        memoization={
+            name: info._asdict() for name, info in memoization_stats().items()
+        },
+    )
+
+
+def summary() -> str:
+    """Return a human-readable summary of the report."""
+    lines = [f"{'stage':<56} {'seconds':>10}"]
+    lines += [
+        f"{k:<56} {v:>10.4f}"
+        for k, v in sorted(_seconds.items(), key=lambda kv: -kv[1])
+    ]
+    lines += ["", f"{'counter':<56} {'value':>10}"]
+    lines += [f"{k:<56} {v:>10}" for k, v in sorted(_counters.items())]
+    lines += ["", f"{'memoized function':<56} {'hits':>10} {'misses':>10}"]
+    lines += [
+        f"{name:<56} {info.hits:>10} {info.misses:>10}"
+        for name, info in memoization_stats().items()
+    ]
+    return "\n".join(lines)
+
+
+def _timed_iter(name: str, iterator: Iterator[T]) -> Iterator[T]:
+    while True:
+        _start(name)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _stop()
+        yield item
+
+
+def _start(name: str) -> None:
+    now = time.perf_counter()
+    if _active_stages:
+        parent, start = _active_stages[-1]
+        _seconds[parent] += now - start
+    _active_stages.append((name, now))
+
+
+def _stop() -> None:
+    now = time.perf_counter()
+    name, start = _active_stages.pop()
+    _seconds[name] += now - start
+    if _active_stages:
+        _active_stages[-1] = (_active_stages[-1][0], now)
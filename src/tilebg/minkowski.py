@@ -3,42 +3,106 @@
 __author__ = "ccornix"
 __copyright__ = "Copyright (c) 2024 ccornix"
 __license__ = "MIT"
-__all__ = ["minkowski_island"]
+__all__ = ["minkowski_island", "minkowski_ring_island"]
 
-from sympy import Matrix, Rational, pi
+from typing import TYPE_CHECKING
+import numpy as np
 
-from .functools import repeated
+from .functools import memoized, repeated
 from .path import (
+    TBackend,
+    TPath,
+    as_array,
+    batch_refined_segments,
+    get_backend,
     points_to_segments,
     refined_segments,
     regular_polygon_path,
     rotation_matrix,
     segments_to_points,
+    transform_stack,
 )
+from .rings import GAUSSIAN, RingPath
 
-R_m90 = rotation_matrix(-pi / 2)
+if TYPE_CHECKING:
+    from sympy import Matrix
 
-# Transformation: scale edge by 1/sqrt(5) and rotate counter-clockwise by
-# arcsin(1/sqrt(5))
-T_minkowski = Rational(1, 5) * Matrix([[2, -1], [1, 2]])
 
+@memoized()
+def _rule_matrices() -> tuple["Matrix", "Matrix"]:
+    """Return the exact transformations of the Minkowski rule."""
+    from sympy import Matrix, Rational, pi
 
-def minkowski_rule(segment: Matrix) -> list[Matrix]:
+    # Transformation: scale edge by 1/sqrt(5) and rotate counter-clockwise by
+    # arcsin(1/sqrt(5))
+    T_minkowski = Rational(1, 5) * Matrix([[2, -1], [1, 2]])
+    R_m90 = rotation_matrix(-pi / 2, backend="sympy")
+    return T_minkowski, R_m90
+
+
+def minkowski_rule(segment: "Matrix") -> list["Matrix"]:
     """Refine a `segment` vector following the Minkowski rule.
 
     Reference:
     https://en.wikipedia.org/wiki/Minkowski_sausage
     """
+    T_minkowski, R_m90 = _rule_matrices()
     v1 = T_minkowski * segment
     v2 = R_m90 * v1
     return [v1, v2, v1]
 
 
-def minkowski_island(iterations: int) -> list[Matrix]:
-    """Return Minkowski island after a given number of `iterations`."""
-    points = regular_polygon_path(4)
-    segments = points_to_segments(points)
+# Linear transforms of the numeric rule, equivalent to `minkowski_rule()`,
+# built without sympy
+_T = np.array([[2, -1], [1, 2]]) / 5
+_R_m90 = np.array([[0, 1], [-1, 0]])
+MINKOWSKI_TRANSFORMS = transform_stack([_T, _R_m90 @ _T, _T])
+
+# Multipliers and divisor of the exact rule in the Gaussian integers,
+# equivalent to `minkowski_rule()`: T_minkowski is `(2 + i) / 5` and R_m90
+# is `-i`
+MINKOWSKI_MULTIPLIERS = ((2, 1), (1, -2), (2, 1))
+MINKOWSKI_DIVISOR = 5
+
+
+def minkowski_island(
+    iterations: int, *, backend: TBackend | None = None
+) -> TPath:
+    """Return Minkowski island after a given number of `iterations`.
+
+    With the numeric `backend`, all segments of a refinement level are
+    expanded in a single array operation.
+    """
+    return _minkowski_island(iterations, backend or get_backend())
+
+
+@memoized()
+def _minkowski_island(iterations: int, backend: TBackend) -> TPath:
+    if backend == "numpy":
+        points = regular_polygon_path(4, backend="numpy")
+        refined = repeated(
+            batch_refined_segments, iterations, MINKOWSKI_TRANSFORMS
+        )(as_array(points_to_segments(points)))
+        return segments_to_points(refined, points[0])
+    points = regular_polygon_path(4, backend="sympy")
+    segments = points_to_segments(points, backend="sympy")
     return segments_to_points(
         list(repeated(refined_segments, iterations, minkowski_rule)(segments)),
         points[0],
+        backend="sympy",
     )
+
+
+def minkowski_ring_island(iterations: int) -> RingPath:
+    """Return Minkowski island after a given number of `iterations`.
+
+    The island is derived exactly in the Gaussian integers, see
+    `RingPath`.
+    """
+    # Vertices of `regular_polygon_path(4)`, rotated clockwise by -i
+    polygon = RingPath.polygon(GAUSSIAN, (0, -1), 4)
+    path = repeated(
+        RingPath.refined, iterations, MINKOWSKI_MULTIPLIERS, MINKOWSKI_DIVISOR
+    )(polygon)
+    assert path.is_closed()
+    return path
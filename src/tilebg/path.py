@@ -2,12 +2,26 @@
 
 Paths are assumed to be composed of straight line segments.
 
+Two interchangeable backends are supported. The exact `"sympy"` backend
+represents a path as a list of 2x1 sympy matrices, while the numeric `"numpy"`
+backend represents it as an `(N, 2)` float64 array. Every function accepts a
+`backend` keyword argument; if omitted, NumPy arrays are processed by the
+numeric backend and anything else by the global default backend, see
+`set_backend()`.
+
 """
 
 __author__ = "ccornix"
 __copyright__ = "Copyright (c) 2024 ccornix"
 __license__ = "MIT"
 __all__ = [
+    "as_array",
+    "as_matrices",
+    "batch_refined_segments",
+    "common_denominators",
+    "edge_keys",
+    "get_backend",
+    "is_closed",
     "points_to_segments",
     "refined_segments",
     "regular_polygon_path",
@@ -15,49 +29,152 @@ __all__ = [
     "rotation_matrix",
     "scale",
     "segments_to_points",
+    "set_backend",
     "shift",
+    "simplify",
+    "simplify_tile",
+    "transform_stack",
 ]
 
 from collections.abc import Callable, Iterable, Sequence
+from fractions import Fraction
 from itertools import accumulate, chain, pairwise, repeat
-from sympy import Expr, Matrix, cos, pi, shape, sin
-from typing import TypeAlias
+from numpy.typing import NDArray
+from typing import TYPE_CHECKING, Literal, TypeAlias
+import math
+import numpy as np
 import operator
 
+from .functools import memoized
+from .instrument import count
+
+# Sympy is slow to import, hence the exact backend imports it on demand only
+if TYPE_CHECKING:
+    from sympy import Expr, Matrix
+
+
+TNum: TypeAlias = "int | float | Expr"
+TArray: TypeAlias = NDArray[np.float64]
+TPath: TypeAlias = "Sequence[Matrix] | TArray"
+TBackend: TypeAlias = Literal["sympy", "numpy"]
+
+BACKENDS: tuple[TBackend, ...] = ("sympy", "numpy")
+
+_default_backend: TBackend = "sympy"
+
+
+def get_backend() -> TBackend:
+    """Return the global default backend."""
+    return _default_backend
+
 
-TNum: TypeAlias = int | Expr
+def set_backend(backend: TBackend) -> None:
+    """Set the global default backend."""
+    global _default_backend
+    assert backend in BACKENDS
+    _default_backend = backend
 
 
-def regular_polygon_path(n: int) -> list[Matrix]:
+def as_array(points: TPath) -> TArray:
+    """Return path points as an `(N, 2)` float64 array."""
+    if isinstance(points, np.ndarray):
+        return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    assert all(_is_2d_vector(v) for v in points)
+    return np.array(
+        [(float(v[0]), float(v[1])) for v in points], dtype=np.float64
+    ).reshape(-1, 2)
+
+
+def as_matrices(points: TPath) -> list["Matrix"]:
+    """Return path points as a list of 2x1 sympy matrices."""
+    if isinstance(points, np.ndarray):
+        from sympy import Matrix
+
+        return [Matrix([x, y]) for x, y in as_array(points).tolist()]
+    return list(points)
+
+
+def is_closed(points: TPath) -> bool:
+    """Return whether the last path point coincides with the first one.
+
+    Exact comparison is used for the sympy backend, while the numpy backend
+    tolerates floating-point round-off.
+    """
+    if isinstance(points, np.ndarray):
+        return bool(np.allclose(points[-1], points[0]))
+    return bool(points[-1] == points[0])
+
+
+def regular_polygon_path(n: int, *, backend: TBackend | None = None) -> TPath:
     """Return points of a regular polygonal path with `n` sides."""
     assert n >= 3
+    return _regular_polygon_path(n, backend or _default_backend)
+
+
+@memoized()
+def _regular_polygon_path(n: int, backend: TBackend) -> TPath:
+    if backend == "numpy":
+        angles = 2 * np.pi * np.arange(n + 1) / n
+        points = np.column_stack((np.sin(angles), np.cos(angles)))
+        points[-1] = points[0]
+        return points
+    from sympy import Matrix, pi
+
     R = rotation_matrix(-2 * pi / n)
-    points = list(
+    matrices = list(
         accumulate(repeat(R, n), lambda v, A: A * v, initial=Matrix([0, 1]))
     )
-    assert points[0] == Matrix([0, 1])
-    assert points[-1] == points[0]
-    return points
+    assert matrices[0] == Matrix([0, 1])
+    assert matrices[-1] == matrices[0]
+    return matrices
 
 
-def points_to_segments(points: Sequence[Matrix]) -> list[Matrix]:
+def points_to_segments(
+    points: TPath, *, backend: TBackend | None = None
+) -> TPath:
     """Return segment vectors from path point coordinates."""
+    if _resolve_backend(points, backend) == "numpy":
+        return np.diff(as_array(points), axis=0)
+    points = as_matrices(points)
     assert all(_is_2d_vector(v) for v in points)
     return [x1 - x0 for x0, x1 in pairwise(points)]
 
 
 def segments_to_points(
-    segments: Sequence[Matrix], initial_point: Matrix
-) -> list[Matrix]:
+    segments: TPath,
+    initial_point: "Matrix | TArray",
+    *,
+    backend: TBackend | None = None,
+) -> TPath:
     """Construct path points from segment vectors and an initial point."""
+    if _resolve_backend(segments, backend) == "numpy":
+        if isinstance(initial_point, np.ndarray):
+            start = as_array(initial_point)
+        else:
+            start = _as_float_pair(initial_point)
+        steps = np.vstack((start, as_array(segments)))
+        return np.cumsum(steps, axis=0)
+    from sympy import Matrix
+
+    segments = as_matrices(segments)
     assert all(_is_2d_vector(v) for v in segments)
-    return list(accumulate(segments, operator.add, initial=initial_point))
+    return list(
+        accumulate(segments, operator.add, initial=Matrix(initial_point))
+    )
 
 
 def scale(
-    points: Sequence[Matrix], factors: tuple[TNum, TNum]
-) -> list[Matrix]:
+    points: TPath,
+    factors: tuple[TNum, TNum],
+    *,
+    backend: TBackend | None = None,
+) -> TPath:
     """Scale path points anisotropically with given factors."""
+    if _resolve_backend(points, backend) == "numpy":
+        return as_array(points) * _as_float_pair(factors)
+    from sympy import Matrix
+
+    points = as_matrices(points)
     assert all(_is_2d_vector(v) for v in points)
     sx, sy = factors
     S = Matrix([[sx, 0], [0, sy]])
@@ -65,36 +182,242 @@ def scale(
 
 
 def shift(
-    points: Sequence[Matrix], offsets: tuple[TNum, TNum]
-) -> list[Matrix]:
-    """Shift path points by given offsets."""
+    points: TPath,
+    offsets: tuple[TNum, TNum],
+    *,
+    backend: TBackend | None = None,
+    denominators: tuple[int, int] | None = None,
+) -> TPath:
+    """Shift path points by given offsets.
+
+    If the numeric coordinates are fractions of given `denominators`, see
+    `common_denominators()`, integer offsets are added to their numerators, so
+    that the shifted coordinates are rounded as if shifted exactly.
+    """
+    count("shift_calls")
+    if _resolve_backend(points, backend) == "numpy":
+        d = _as_float_pair(offsets)
+        if denominators is None or not all(map(float.is_integer, d)):
+            return as_array(points) + d
+        scales = np.array(denominators, dtype=np.float64)
+        return (np.rint(as_array(points) * scales) + d * scales) / scales
+    from sympy import Matrix
+
+    points = as_matrices(points)
     assert all(_is_2d_vector(v) for v in points)
     d = Matrix(offsets)
     return [v + d for v in points]
 
 
-def rotate(points: Sequence[Matrix], theta: TNum) -> list[Matrix]:
+def rotate(
+    points: TPath, theta: TNum, *, backend: TBackend | None = None
+) -> TPath:
     """Rotate path points by given angle.
 
     The angle `theta` of rotation is expected in radians.
     """
+    if _resolve_backend(points, backend) == "numpy":
+        R = rotation_matrix(theta, backend="numpy")
+        return as_array(points) @ R.T
+    points = as_matrices(points)
     assert all(_is_2d_vector(v) for v in points)
     R = rotation_matrix(theta)
     return [R * v for v in points]
 
 
-def rotation_matrix(theta: TNum) -> Matrix:
+def rotation_matrix(
+    theta: TNum, *, backend: TBackend | None = None
+) -> "Matrix | TArray":
     """Return a rotation matrix.
 
     The angle `theta` of rotation is expected in radians.
     """
+    return _rotation_matrix(theta, backend or _default_backend)
+
+
+@memoized()
+def _rotation_matrix(theta: TNum, backend: TBackend) -> "Matrix | TArray":
+    if backend == "numpy":
+        c, s = np.cos(float(theta)), np.sin(float(theta))
+        return np.array([[c, -s], [s, c]], dtype=np.float64)
+    from sympy import Matrix, cos, sin
+
     c, s = cos(theta), sin(theta)
     return Matrix([[c, -s], [s, c]])
 
 
+def simplify(
+    points: TPath,
+    tolerance: float = 0.0,
+    *,
+    backend: TBackend | None = None,
+) -> TPath:
+    """Return path points without redundant ones.
+
+    With zero `tolerance`, simplification is lossless: only points between
+    collinear segments of the same direction are dropped, which is exact for
+    the sympy backend and up to floating-point round-off for the numpy one.
+    With a positive `tolerance`, the Ramer-Douglas-Peucker algorithm also
+    drops any detail deviating less than `tolerance` from the simplified path,
+    which is always done numerically. The first and last points are kept.
+    Copies of a tile simplified this way no longer fit their neighbors, see
+    `simplify_tile()` instead.
+    """
+    assert tolerance >= 0
+    if tolerance > 0:
+        points = as_array(points)
+        return points[_douglas_peucker(points, tolerance)]
+    if _resolve_backend(points, backend) == "numpy":
+        points = as_array(points)
+        # Drop repeated points first, so that directions are well-defined
+        duplicate = np.all(points[1:] == points[:-1], axis=1)
+        points = points[~np.concatenate(([False], duplicate))]
+        if len(points) < 3:
+            return points
+        a, b = np.diff(points[:-1], axis=0), np.diff(points[1:], axis=0)
+        cross = a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0]
+        norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+        redundant = (np.abs(cross) <= 1e-12 * norms) & (
+            np.einsum("ij,ij->i", a, b) > 0
+        )
+        return points[np.concatenate(([True], ~redundant, [True]))]
+    from sympy import expand
+
+    points = as_matrices(points)
+    assert all(_is_2d_vector(v) for v in points)
+    kept = points[:1]
+    for v, w in pairwise(points[1:]):
+        a, b = v - kept[-1], w - v
+        cross = expand(a[0] * b[1] - a[1] * b[0])
+        if cross != 0 or expand(a.dot(b)) < 0:
+            kept.append(v)
+    return kept + points[-1:] if len(points) > 1 else kept
+
+
+def simplify_tile(
+    points: TPath,
+    tolerance: float,
+    translations: Sequence[tuple[TNum, TNum]],
+    decimals: int = 6,
+) -> TArray:
+    """Return the closed path of a tile simplified consistently with tiling.
+
+    The neighbors of the tile are its copies shifted by `translations`. The
+    boundary is split at the vertices where the adjacent neighbor changes,
+    with coordinates matched up to `decimals`, see `edge_keys()`. Each run of
+    edges is simplified by the Ramer-Douglas-Peucker algorithm with given
+    positive `tolerance`, keeping the same points of the opposite run shared
+    with the opposite neighbor. Hence the simplified copies still fit without
+    gaps or overlaps, unlike those simplified by `simplify()`.
+    """
+    assert tolerance > 0
+    array = as_array(points)
+    assert is_closed(array)
+    vertices = array[:-1]
+    n = len(vertices)
+    ends = np.roll(vertices, -1, axis=0)
+    edge_index = {
+        key: i
+        for i, key in enumerate(
+            map(tuple, edge_keys(vertices, ends, decimals).tolist())
+        )
+    }
+    vertex_index = {
+        key: i
+        for i, key in enumerate(
+            map(tuple, _point_keys(vertices, decimals).tolist())
+        )
+    }
+    shifts = np.array(translations, dtype=np.float64).reshape(-1, 2)
+
+    # Index of the translation of the neighbor sharing each edge, if any
+    low, high = vertices.min(axis=0), vertices.max(axis=0)
+    neighbors = np.full(n, -1)
+    for j, t in enumerate(shifts):
+        if np.any(low + t > high) or np.any(high + t < low):
+            continue
+        shifted_keys = edge_keys(vertices + t, ends + t, decimals)
+        for key in map(tuple, shifted_keys.tolist()):
+            i = edge_index.get(key)
+            if i is not None:
+                neighbors[i] = j
+
+    junctions = np.flatnonzero(neighbors != np.roll(neighbors, 1))
+    if len(junctions) == 0:
+        junctions = np.array([0])
+    keep = np.zeros(n, dtype=np.bool_)
+    keep[junctions] = True
+    done = np.zeros(n, dtype=np.bool_)
+    for a, b in zip(junctions, np.roll(junctions, -1)):
+        if done[a]:
+            continue
+        run = (a + np.arange(((b - a - 1) % n) + 2)) % n
+        run_keep = _douglas_peucker(vertices[run], tolerance)
+        keep[run] |= run_keep
+        done[run[:-1]] = True
+        if neighbors[a] < 0:
+            continue
+        # The opposite run is the one shared with the opposite neighbor
+        opposite_keys = _point_keys(
+            vertices[run] - shifts[neighbors[a]], decimals
+        )
+        opposite = [
+            vertex_index.get(key) for key in map(tuple, opposite_keys.tolist())
+        ]
+        if None in opposite:
+            continue
+        o = np.array(opposite)
+        keep[o] |= run_keep
+        done[np.where((o[:-1] - o[1:]) % n == 1, o[1:], o[:-1])] = True
+    simplified = vertices[keep]
+    return np.vstack((simplified, simplified[:1]))
+
+
+def edge_keys(starts: TArray, ends: TArray, decimals: int = 6) -> TArray:
+    """Return canonical keys of line segments between given points.
+
+    Row `i` of the returned `(N, 4)` integer array identifies the segment
+    from `starts[i]` to `ends[i]` regardless of its direction, with endpoint
+    coordinates rounded to `decimals`, so that equal segments of shifted
+    copies of a path have equal keys despite floating-point round-off.
+    """
+    a = np.rint(as_array(starts) * 10**decimals).astype(np.int64)
+    b = np.rint(as_array(ends) * 10**decimals).astype(np.int64)
+    swap = (a[:, 0] > b[:, 0]) | ((a[:, 0] == b[:, 0]) & (a[:, 1] > b[:, 1]))
+    return np.where(swap[:, None], np.hstack((b, a)), np.hstack((a, b)))
+
+
+def common_denominators(
+    points: TPath, max_denominator: int = 2**20
+) -> tuple[int, int] | None:
+    """Return the common denominators of the x and y coordinates, if any.
+
+    Each coordinate is taken as the simplest fraction that rounds to it, with
+    a denominator up to `max_denominator`. Returns `None` unless the least
+    common denominators of both axes are within this limit as well.
+    """
+    array = as_array(points)
+    denominators = []
+    for values in array.T:
+        denominator = 1
+        for value in np.unique(values).tolist():
+            fraction = Fraction(value).limit_denominator(max_denominator)
+            denominator = math.lcm(denominator, fraction.denominator)
+            if denominator > max_denominator:
+                return None
+        numerators = np.rint(values * denominator)
+        if np.abs(numerators).max(initial=0) >= 2**52 or not np.array_equal(
+            numerators / denominator, values
+        ):
+            return None
+        denominators.append(denominator)
+    x, y = denominators
+    return x, y
+
+
 def refined_segments(
-    segments: Iterable[Matrix], rule: Callable[..., Iterable[Matrix]]
-) -> Iterable[Matrix]:
+    segments: Iterable["Matrix"], rule: Callable[..., Iterable["Matrix"]]
+) -> Iterable["Matrix"]:
     """Return an iterator over path `segments` refined according to `rule`.
 
     Function `rule` is expected to return an iterable of refined line segment
@@ -103,5 +426,76 @@ def refined_segments(
     return chain.from_iterable(rule(segment) for segment in segments)
 
 
+def transform_stack(transforms: Sequence["Matrix | TArray"]) -> TArray:
+    """Return a `(K, 2, 2)` float64 array stacked from 2x2 `transforms`."""
+    return np.array(
+        [np.asarray(T, dtype=np.float64).reshape(2, 2) for T in transforms],
+        dtype=np.float64,
+    ).reshape(-1, 2, 2)
+
+
+def batch_refined_segments(segments: TArray, transforms: TArray) -> TArray:
+    """Return all path `segments` refined at once by a stack of `transforms`.
+
+    Each of the `N` segment vectors is replaced by `K` vectors obtained by
+    applying the `(K, 2, 2)` stack of linear `transforms` to it in order,
+    yielding an `(N * K, 2)` array. This is the vectorized counterpart of
+    `refined_segments()` for rules that are linear in the segment vector.
+    """
+    refined: TArray = np.einsum("kij,nj->nki", transforms, as_array(segments))
+    return refined.reshape(-1, 2)
+
+
+def _point_keys(points: TArray, decimals: int) -> NDArray[np.int64]:
+    keys: NDArray[np.int64] = np.rint(points * 10**decimals).astype(np.int64)
+    return keys
+
+
+def _douglas_peucker(points: TArray, tolerance: float) -> NDArray[np.bool_]:
+    """Return the mask of points kept by the Ramer-Douglas-Peucker method."""
+    keep = np.zeros(len(points), dtype=np.bool_)
+    keep[[0, -1]] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        i, j = stack.pop()
+        if j - i < 2:
+            continue
+        inner = points[slice(i + 1, j)]
+        distances = _segment_distances(inner, points[i], points[j])
+        k = int(np.argmax(distances))
+        if distances[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            stack += [(i, k), (k, j)]
+    return keep
+
+
+def _segment_distances(points: TArray, a: TArray, b: TArray) -> TArray:
+    """Return the distances of `points` from the line segment `a`-`b`."""
+    d = b - a
+    length2 = d @ d
+    t = np.clip((points - a) @ d / length2, 0, 1) if length2 > 0 else 0.0
+    distances: TArray = np.linalg.norm(
+        points - a - np.multiply.outer(t, d), axis=1
+    )
+    return distances
+
+
+def _resolve_backend(points: TPath, backend: TBackend | None) -> TBackend:
+    if backend is not None:
+        assert backend in BACKENDS
+        return backend
+    if isinstance(points, np.ndarray):
+        return "numpy"
+    return _default_backend
+
+
+def _as_float_pair(values: Sequence[TNum]) -> TArray:
+    x, y = values
+    return np.array([float(x), float(y)], dtype=np.float64)
+
+
 def _is_2d_vector(obj) -> bool:
-    return isinstance(obj, Matrix) and shape(obj) == (2, 1)
+    from sympy import MatrixBase, shape
+
+    return isinstance(obj, MatrixBase) and shape(obj) == (2, 1)
@@ -1,5 +1,50 @@
-from . import (
-    hexagons,
-    gosperflakes2,
-    minkowskiflakes4,
-)
+"""Registry of background image patterns.
+
+Pattern names are listed statically, so that the available patterns are known
+without importing them. Only the module of a selected pattern is imported, see
+`load()`. The paths of the grid of a pattern can also be generated in chunks,
+see `grid_chunk()`.
+
+"""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (c) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["PATTERNS", "grid_chunk", "load"]
+
+from collections.abc import Iterable
+from importlib import import_module
+from types import ModuleType
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from ..svg import SVGElement
+
+PATTERNS = ("gosperflakes2", "hexagons", "minkowskiflakes4")
+
+
+def load(name: str) -> ModuleType:
+    """Import and return the module of pattern `name`."""
+    if name not in PATTERNS:
+        raise ValueError(f"unknown pattern: {name}")
+    return import_module(f".{name}", __name__)
+
+
+def grid_chunk(
+    name: str, options: dict[str, Any], row_chunk: tuple[int, int]
+) -> Iterable["SVGElement"]:
+    """Return the paths of a chunk of rows of the grid of pattern `name`.
+
+    The grid is generated with the parameter `options` of the pattern, see
+    `iter_grid()` for `row_chunk`. A partial application of this function
+    is a picklable `paths_fn` for `write_svg_chunks()`.
+    """
+    parameters = load(name).parameters(row_chunk=row_chunk, **options)
+    paths: Iterable["SVGElement"] = parameters["paths"]
+    return paths
+
+
+def __getattr__(name: str) -> ModuleType:
+    if name in PATTERNS:
+        return load(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,33 +4,57 @@ __author__ = "ccornix"
 __copyright__ = "Copyright (c) 2024 ccornix"
 __license__ = "MIT"
 
+from collections.abc import Callable
 from typing import Any
 
-from ..minkowski import minkowski_island
+from ..cache import cached_island
+from ..functools import memoized
 from ..grid import (
-    generate_grid,
+    generate_compact_grid,
+    iter_grid,
     make_odd_row_shift_offsets_fn,
-    make_random_fill_svg_class_fn,
+    make_hashed_fill_svg_class_fn,
 )
-from ..path import scale
+from ..path import TPath
 
 
-def parameters() -> dict[str, Any]:
-    isle = minkowski_island(iterations=4)
-    resolution = 1920, 1200
-    cell_width, cell_height = 120, 120
-    element_path = scale(isle, (cell_width // 2, cell_height // 2))
+DEFAULT_CELL_SIZE = (120, 120)
+
+
+@memoized()
+def scaled_element_path(cell_width: int, cell_height: int) -> TPath:
+    """Return the path of a Minkowski island fitted into a cell."""
+    isle = cached_island("minkowski", iterations=4)
+    return isle.as_array((cell_width // 2, cell_height // 2))
+
+
+def make_svg_class_fn(seed: int = 1) -> Callable[[int, int], list[str]]:
+    """Return the SVG class factory function of the tiles."""
+    return make_hashed_fill_svg_class_fn(fill_count=3, seed=seed)
+
+
+def parameters(
+    *,
+    resolution: tuple[int, int] = (1920, 1200),
+    cell_size: tuple[int, int] = DEFAULT_CELL_SIZE,
+    seed: int = 1,
+    compact: bool = False,
+    **grid_options: Any,
+) -> dict[str, Any]:
+    cell_width, cell_height = cell_size
+    element_path = scaled_element_path(cell_width, cell_height)
     spacings = (cell_width, cell_height // 2)
 
     return dict(
         author=__author__,
         title="Randomly colored Minkowski islands",
         resolution=resolution,
-        paths=generate_grid(
+        paths=(generate_compact_grid if compact else iter_grid)(
             element_path=element_path,
             spacings=spacings,
             resolution=resolution,
             offsets_fn=make_odd_row_shift_offsets_fn(cell_width // 2),
-            svg_class_fn=make_random_fill_svg_class_fn(fill_count=3),
+            svg_class_fn=make_svg_class_fn(seed),
+            **grid_options,
         ),
     )
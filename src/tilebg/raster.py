@@ -0,0 +1,445 @@
+"""Native PNG rendering of tiled backgrounds.
+
+Instead of parsing and filling every path of an SVG, the shared geometry of
+the tiles is rasterized only once into anti-aliased fill and stroke coverage
+masks at the target scale. These masks are then stamped at each tile position
+with the fill and stroke colors of the tile into a NumPy pixel buffer. Colors
+are taken from the same CSS that is embedded into the SVG.
+
+PNG files are rendered in horizontal bands, optionally in a pool of worker
+processes, and streamed into the encoder band by band, so that memory use is
+bounded by the band size rather than the image size. PNG files are encoded
+with the Python Standard Library only.
+
+"""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (c) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["parse_css", "render", "render_png", "write_png"]
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from itertools import pairwise
+from numpy.typing import NDArray
+from typing import Any, BinaryIO
+import math
+import numpy as np
+import os
+import re
+import struct
+import zlib
+
+from .functools import ordered_map
+from .instrument import count, stage, timed_iter
+from .path import TArray, as_array, is_closed
+from .svg import (
+    SVG_HEADER_TEMPLATE,
+    SVGElement,
+    SVGPolylines,
+    SVGTile,
+    SVGUse,
+)
+
+TMask = NDArray[np.float32]
+TColor = tuple[float, float, float]
+
+# Supersampling factor of anti-aliasing along each axis
+SAMPLES = 4
+
+# Subpixel positions of the tiles are quantized to this fraction of a pixel
+PHASES = 8
+
+DEFAULT_BAND_ROWS = 256
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Size of the blocks of image data passed to the compressor and of the IDAT
+# chunks of compressed data, except for the last ones
+IDAT_SIZE = 2**16
+
+
+def parse_css(css: str) -> dict[str, dict[str, str]]:
+    """Return the properties of each class selector in a style sheet."""
+    css = css.replace("{{", "{").replace("}}", "}")
+    return {
+        name: dict(
+            (key.strip(), value.strip())
+            for key, _, value in (
+                decl.partition(":") for decl in body.split(";") if ":" in decl
+            )
+        )
+        for name, body in re.findall(r"\.([\w-]+)\s*\{([^}]*)\}", css)
+    }
+
+
+DEFAULT_STYLES = parse_css(SVG_HEADER_TEMPLATE)
+
+
+@dataclass(frozen=True)
+class Stamp:
+    """Coverage masks of a tile to be painted at a given pixel position."""
+
+    x: int
+    y: int
+    fill_mask: TMask | None
+    fill: TColor | None
+    stroke_mask: TMask | None
+    stroke: TColor | None
+
+    @property
+    def rows(self) -> range:
+        """Return the range of image rows covered by the stamp."""
+        heights = [
+            len(mask)
+            for mask in (self.fill_mask, self.stroke_mask)
+            if mask is not None
+        ]
+        return range(self.y, self.y + max(heights, default=0))
+
+
+def render(
+    *,
+    resolution: tuple[int, int],
+    paths: Iterable[SVGElement],
+    scale: float = 1.0,
+    styles: dict[str, dict[str, str]] | None = None,
+    **_: Any,
+) -> NDArray[np.uint8]:
+    """Render tiles into an RGBA pixel buffer.
+
+    The nominal `resolution` of the image is multiplied by `scale` to obtain
+    the size of the buffer. Tile colors are looked up by class in `styles`,
+    which defaults to the style sheet embedded into generated SVGs. Further
+    keyword arguments, e.g., SVG metadata, are ignored.
+    """
+    width, height = _pixel_size(resolution, scale)
+    image = np.zeros((height, width, 4), dtype=np.uint8)
+    stamps = iter_stamps(
+        resolution=resolution, paths=paths, scale=scale, styles=styles
+    )
+    with stage("painting"):
+        for stamp in timed_iter("rasterization", stamps):
+            paint(image, 0, stamp)
+    return image
+
+
+def render_png(
+    file: BinaryIO,
+    *,
+    resolution: tuple[int, int],
+    paths: Iterable[SVGElement],
+    scale: float = 1.0,
+    styles: dict[str, dict[str, str]] | None = None,
+    compress_level: int = 6,
+    band_rows: int = DEFAULT_BAND_ROWS,
+    workers: int | None = 1,
+    **_: Any,
+) -> None:
+    """Render tiles and write them as a PNG into a binary `file`.
+
+    The image is rendered in horizontal bands of `band_rows` rows, each of
+    which only paints the tiles overlapping it. With more than one `workers`
+    (or `None` for one per CPU), bands are rendered in a process pool. Bands
+    are encoded in order as soon as they are ready, keeping at most two bands
+    per worker in flight. See `render()` for the rest of the arguments.
+    """
+    assert band_rows > 0
+    width, height = _pixel_size(resolution, scale)
+    bands: list[list[Stamp]] = [[] for _ in range(0, height, band_rows)]
+    with stage("rasterization"):
+        for stamp in iter_stamps(
+            resolution=resolution, paths=paths, scale=scale, styles=styles
+        ):
+            rows = range(
+                max(stamp.rows.start, 0), min(stamp.rows.stop, height)
+            )
+            if rows:
+                for i in range(
+                    rows[0] // band_rows, rows[-1] // band_rows + 1
+                ):
+                    bands[i].append(stamp)
+    tasks = (
+        (row, min(band_rows, height - row), width, stamps)
+        for row, stamps in zip(range(0, height, band_rows), bands)
+    )
+    images = ordered_map(
+        _render_band, tasks, workers=workers or os.cpu_count() or 1
+    )
+    with stage("painting_and_encoding"):
+        write_png(file, images, (width, height), compress_level=compress_level)
+
+
+def iter_stamps(
+    *,
+    resolution: tuple[int, int],
+    paths: Iterable[SVGElement],
+    scale: float = 1.0,
+    styles: dict[str, dict[str, str]] | None = None,
+) -> Iterator[Stamp]:
+    """Return an iterator over the stamps of tiles in painting order.
+
+    Masks of tiles sharing the same geometry are rasterized only once for
+    each subpixel phase of their positions. Shared-edge polylines are not
+    supported, tiles have to be stroked individually.
+    """
+    styles = DEFAULT_STYLES if styles is None else styles
+    _, height = resolution
+    # Masks by shared geometry, phase and stroke style, keeping the geometry
+    # object alive so that its id is not reused
+    masks: dict[tuple[Any, ...], tuple[object, Any, Any, int, int]] = {}
+    for path in timed_iter("layout", paths):
+        shared: object | None
+        if isinstance(path, SVGUse):
+            points, offsets = path.element.points, path.offsets
+            shared = path.element
+        elif isinstance(path, SVGTile):
+            points, offsets = path.element_path, path.offsets
+            shared = path.element_path
+        elif isinstance(path, SVGPolylines):
+            raise ValueError("shared-edge polylines cannot be rasterized")
+        else:
+            points, offsets, shared = path.points, (0, 0), None
+        style = _tile_style(path.svg_class, styles)
+        ox, oy = offsets
+        x, y = float(ox) * scale, (height - float(oy)) * scale
+        ix, iy = math.floor(x), math.floor(y)
+        phase_x = round((x - ix) * PHASES)
+        phase_y = round((y - iy) * PHASES)
+        fill, stroke_width = style["fill"] is not None, style["stroke_width"]
+        key = (id(shared), phase_x, phase_y, fill, stroke_width)
+        if shared is None or key not in masks:
+            count("masks")
+            fill_mask, stroke_mask, mx, my = rasterize(
+                as_array(points) * (scale, -scale)
+                + (phase_x / PHASES, phase_y / PHASES),
+                fill=fill,
+                stroke_width=stroke_width * scale,
+            )
+            if shared is not None:
+                masks[key] = (shared, fill_mask, stroke_mask, mx, my)
+        else:
+            _, fill_mask, stroke_mask, mx, my = masks[key]
+        count("stamps")
+        yield Stamp(
+            x=ix + mx,
+            y=iy + my,
+            fill_mask=fill_mask,
+            fill=style["fill"],
+            stroke_mask=stroke_mask,
+            stroke=style["stroke"],
+        )
+
+
+def rasterize(
+    points: TArray, *, fill: bool = True, stroke_width: float = 0.0
+) -> tuple[TMask | None, TMask | None, int, int]:
+    """Rasterize a path given in pixel coordinates into coverage masks.
+
+    Return the fill and stroke masks and the pixel coordinates of their top
+    left corner. Masks are anti-aliased by supersampling.
+    """
+    pad = stroke_width / 2 + 1
+    x0, y0 = np.floor(points.min(axis=0) - pad).astype(int)
+    x1, y1 = np.ceil(points.max(axis=0) + pad).astype(int)
+    w, h = x1 - x0, y1 - y0
+    xs = x0 + (np.arange(w * SAMPLES) + 0.5) / SAMPLES
+    ys = y0 + (np.arange(h * SAMPLES) + 0.5) / SAMPLES
+    segments = np.stack((points[:-1], points[1:]), axis=1)
+    if not is_closed(points):
+        segments = np.concatenate((segments, [[points[-1], points[0]]]))
+
+    fill_mask = _downsample(_inside(segments, xs, ys), w, h) if fill else None
+    stroke_mask = None
+    if stroke_width > 0:
+        near = _near(segments, xs, ys, x0, y0, stroke_width / 2)
+        stroke_mask = _downsample(near, w, h)
+    return fill_mask, stroke_mask, int(x0), int(y0)
+
+
+def paint(image: NDArray[np.uint8], row: int, stamp: Stamp) -> None:
+    """Paint a `stamp` onto an RGBA `image` whose first row is at `row`."""
+    for mask, color in (
+        (stamp.fill_mask, stamp.fill),
+        (stamp.stroke_mask, stamp.stroke),
+    ):
+        if mask is not None and color is not None:
+            _composite(image, mask, stamp.x, stamp.y - row, color)
+
+
+def write_png(
+    file: BinaryIO,
+    bands: Iterable[NDArray[np.uint8]],
+    size: tuple[int, int],
+    *,
+    compress_level: int = 6,
+) -> None:
+    """Write horizontal `bands` of RGBA rows incrementally as a PNG file.
+
+    The bands, each an `(rows, width, 4)` array, must add up to the given
+    `(width, height)` image `size`. Image data is compressed and written in
+    blocks of `IDAT_SIZE` bytes, so that the file does not depend on the
+    bands.
+    """
+    width, height = size
+    file.write(PNG_SIGNATURE)
+    _write_chunk(
+        file, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    )
+    compressor = zlib.compressobj(compress_level)
+    raw = bytearray()
+    pending = bytearray()
+    rows = 0
+    for band in bands:
+        assert band.shape[1:] == (width, 4)
+        rows += len(band)
+        # Prefix each row by filter type 0 (none)
+        band_raw = np.zeros((len(band), 1 + 4 * width), dtype=np.uint8)
+        band_raw[:, 1:] = band.reshape(len(band), -1)
+        raw += band_raw.tobytes()
+        for block in _take_blocks(raw):
+            pending += compressor.compress(block)
+        for block in _take_blocks(pending):
+            _write_chunk(file, b"IDAT", block)
+    assert rows == height
+    pending += compressor.compress(raw) + compressor.flush()
+    for block in _take_blocks(pending) + [bytes(pending)]:
+        _write_chunk(file, b"IDAT", block)
+    _write_chunk(file, b"IEND", b"")
+
+
+def _take_blocks(buffer: bytearray) -> list[bytes]:
+    """Remove and return the complete blocks of `IDAT_SIZE` bytes."""
+    size = len(buffer) - len(buffer) % IDAT_SIZE
+    view = memoryview(buffer)
+    blocks = [
+        bytes(view[start:end])
+        for start, end in pairwise(range(0, size + 1, IDAT_SIZE))
+    ]
+    view.release()
+    del buffer[:size]
+    return blocks
+
+
+def _render_band(task: tuple[int, int, int, list[Stamp]]) -> NDArray[np.uint8]:
+    """Render a band of `rows` image rows starting at `row`."""
+    row, rows, width, stamps = task
+    image = np.zeros((rows, width, 4), dtype=np.uint8)
+    for stamp in stamps:
+        paint(image, row, stamp)
+    return image
+
+
+def _pixel_size(resolution: tuple[int, int], scale: float) -> tuple[int, int]:
+    width, height = resolution
+    return round(width * scale), round(height * scale)
+
+
+def _tile_style(
+    svg_class: list[str], styles: dict[str, dict[str, str]]
+) -> dict[str, Any]:
+    properties: dict[str, str] = {}
+    for name in svg_class:
+        properties.update(styles.get(name, {}))
+    return dict(
+        fill=_parse_color(properties.get("fill")),
+        stroke=_parse_color(properties.get("stroke")),
+        stroke_width=float(properties.get("stroke-width", "1")),
+    )
+
+
+def _parse_color(value: str | None) -> TColor | None:
+    if value is None or value == "none":
+        return None
+    value = value.removesuffix("!important").strip().lstrip("#")
+    if len(value) == 3:
+        value = "".join(2 * c for c in value)
+    r, g, b = bytes.fromhex(value)
+    return r / 255, g / 255, b / 255
+
+
+def _inside(
+    segments: NDArray[np.float64], xs: TArray, ys: TArray
+) -> NDArray[np.bool_]:
+    """Return which sample points lie inside a polygon (even-odd rule)."""
+    (px0, py0), (px1, py1) = segments[:, 0].T, segments[:, 1].T
+    Y = ys[:, None]
+    crosses = (py0 > Y) != (py1 > Y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = px0 + (Y - py0) * (px1 - px0) / (py1 - py0)
+    x_cross = np.sort(np.where(crosses, x_cross, np.inf), axis=1)
+    inside = np.empty((len(ys), len(xs)), dtype=np.bool_)
+    for i, row in enumerate(x_cross):
+        inside[i] = np.searchsorted(row, xs) % 2 == 1
+    return inside
+
+
+def _near(
+    segments: NDArray[np.float64],
+    xs: TArray,
+    ys: TArray,
+    x0: int,
+    y0: int,
+    radius: float,
+) -> NDArray[np.bool_]:
+    """Return which sample points lie within `radius` from any segment."""
+    near = np.zeros((len(ys), len(xs)), dtype=np.bool_)
+    for (ax, ay), (bx, by) in segments:
+        # Restrict the distance computation to the bounding box of the stroke
+        rows = _window(min(ay, by) - radius, max(ay, by) + radius, y0)
+        cols = _window(min(ax, bx) - radius, max(ax, bx) + radius, x0)
+        X, Y = xs[None, cols], ys[rows, None]
+        dx, dy = bx - ax, by - ay
+        length2 = dx * dx + dy * dy
+        if length2 > 0:
+            t = np.clip(((X - ax) * dx + (Y - ay) * dy) / length2, 0, 1)
+        else:
+            t = np.zeros_like(X)
+        distance2 = (X - ax - t * dx) ** 2 + (Y - ay - t * dy) ** 2
+        near[rows, cols] |= distance2 <= radius * radius
+    return near
+
+
+def _window(low: float, high: float, origin: int) -> slice:
+    """Return the slice of samples between two pixel coordinates."""
+    start = max(math.floor((low - origin) * SAMPLES), 0)
+    return slice(start, math.ceil((high - origin) * SAMPLES) + 1)
+
+
+def _downsample(samples: NDArray[np.bool_], w: int, h: int) -> TMask:
+    mask: TMask = samples.reshape(h, SAMPLES, w, SAMPLES).mean(
+        axis=(1, 3), dtype=np.float32
+    )
+    return mask
+
+
+def _composite(
+    image: NDArray[np.uint8], mask: TMask, x: int, y: int, color: TColor
+) -> None:
+    """Composite a solid `color` with `mask` coverage onto `image`."""
+    height, width, _ = image.shape
+    h, w = mask.shape
+    r0, r1 = max(y, 0), min(y + h, height)
+    c0, c1 = max(x, 0), min(x + w, width)
+    if r0 >= r1 or c0 >= c1:
+        return
+    rows, cols = slice(r0 - y, r1 - y), slice(c0 - x, c1 - x)
+    alpha = mask[rows, cols, None]
+    region = image[r0:r1, c0:c1].astype(np.float32) / 255
+    dst_alpha = region[..., 3:]
+    out_alpha = alpha + dst_alpha * (1 - alpha)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out_color = (
+            np.asarray(color, dtype=np.float32) * alpha
+            + region[..., :3] * dst_alpha * (1 - alpha)
+        ) / out_alpha
+    region[..., :3] = np.nan_to_num(out_color)
+    region[..., 3:] = out_alpha
+    image[r0:r1, c0:c1] = np.rint(region * 255).astype(np.uint8)
+
+
+def _write_chunk(file: BinaryIO, tag: bytes, data: bytes) -> None:
+    file.write(struct.pack(">I", len(data)))
+    file.write(tag)
+    file.write(data)
+    file.write(struct.pack(">I", zlib.crc32(tag + data)))
@@ -0,0 +1,153 @@
+"""Exact path arithmetic in rings of algebraic integers.
+
+The vertices of the Minkowski islands are Gaussian integers `a + b*i`, while
+those of the Gosper islands are Eisenstein integers `a + b*w`, with
+`w = (-1 + i*sqrt(3)) / 2`, in both cases divided by a common integer
+denominator. Representing points by integer coefficient pairs keeps the
+derivation of an island exact, including the closed-path check, at the speed
+of integer arithmetic instead of symbolic simplification.
+
+"""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (c) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["EISENSTEIN", "GAUSSIAN", "Ring", "RingPath"]
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from decimal import Decimal, localcontext
+from numpy.typing import NDArray
+from typing import TypeAlias
+import numpy as np
+
+from .path import TArray
+
+TIntArray: TypeAlias = NDArray[np.int64]
+TFactor: TypeAlias = int | Decimal
+
+# Coefficients up to this bound can be multiplied without int64 overflow
+_MAX_COEFFICIENT = 2**30
+
+
+@dataclass(frozen=True)
+class Ring:
+    """Ring of integers `a + b*u` for a quadratic integer `u`.
+
+    The basis element `u` is the root of `u**2 + trace*u + norm` with a
+    positive imaginary part. Integers are mapped to the plane multiplied by
+    the imaginary unit, so that `1` is the point `(0, 1)`, the first vertex of
+    `regular_polygon_path()`.
+    """
+
+    name: str
+    trace: int
+    norm: int
+
+    def multiply(self, u: TIntArray, v: Sequence[int]) -> TIntArray:
+        """Return the products of `(N, 2)` coefficient pairs `u` with `v`."""
+        if np.abs(u).max(initial=0) > _MAX_COEFFICIENT:
+            raise OverflowError("coefficients exceed the int64 range")
+        a, b = u[:, 0], u[:, 1]
+        c, d = v
+        bd = b * d
+        return np.column_stack(
+            (a * c - self.norm * bd, a * d + b * c - self.trace * bd)
+        )
+
+    def to_plane(
+        self,
+        a: int,
+        b: int,
+        denominator: int,
+        factors: tuple[TFactor, TFactor] = (1, 1),
+    ) -> tuple[float, float]:
+        """Return the point of `(a + b*u) / denominator` rounded to floats.
+
+        The point is scaled by `factors` before rounding.
+        """
+        fx, fy = factors
+        with localcontext(prec=40):
+            imag = Decimal(4 * self.norm - self.trace**2).sqrt()
+            x = -Decimal(b) * imag * Decimal(fx) / Decimal(2 * denominator)
+            y = (
+                Decimal(2 * a - b * self.trace)
+                * Decimal(fy)
+                / Decimal(2 * denominator)
+            )
+        return float(x), float(y)
+
+
+GAUSSIAN = Ring("gaussian", trace=0, norm=1)
+EISENSTEIN = Ring("eisenstein", trace=1, norm=1)
+
+
+@dataclass(frozen=True)
+class RingPath:
+    """Path of points `numerators / denominator` in `ring`.
+
+    Row `i` of the `(N, 2)` integer array `numerators` holds the coefficients
+    of point `i`.
+    """
+
+    ring: Ring
+    numerators: TIntArray
+    denominator: int = 1
+
+    def __len__(self) -> int:
+        return len(self.numerators)
+
+    @classmethod
+    def polygon(
+        cls, ring: Ring, rotation: Sequence[int], n: int
+    ) -> "RingPath":
+        """Return the closed path of `n` vertices starting from `1`.
+
+        Each vertex is the previous one multiplied by the unit `rotation`.
+        """
+        vertices = [np.array([[1, 0]], dtype=np.int64)]
+        for _ in range(n):
+            vertices.append(ring.multiply(vertices[-1], rotation))
+        return cls(ring, np.vstack(vertices))
+
+    def segments(self) -> TIntArray:
+        """Return the numerators of the segment vectors of the path."""
+        return np.diff(self.numerators, axis=0)
+
+    def refined(
+        self, multipliers: Sequence[Sequence[int]], divisor: int
+    ) -> "RingPath":
+        """Return the path with each segment replaced by scaled copies.
+
+        Each segment vector is replaced by its products with `multipliers` in
+        order, divided by `divisor`, starting from the same initial point.
+        """
+        segments = np.stack(
+            [self.ring.multiply(self.segments(), m) for m in multipliers],
+            axis=1,
+        ).reshape(-1, 2)
+        return RingPath(
+            self.ring,
+            np.cumsum(
+                np.vstack((self.numerators[:1] * divisor, segments)), axis=0
+            ),
+            self.denominator * divisor,
+        )
+
+    def is_closed(self) -> bool:
+        """Return whether the last point coincides exactly with the first."""
+        return bool(np.array_equal(self.numerators[-1], self.numerators[0]))
+
+    def as_array(self, factors: tuple[TFactor, TFactor] = (1, 1)) -> TArray:
+        """Return the points as an `(N, 2)` float64 array.
+
+        The points are scaled anisotropically by `factors` while still exact,
+        so that the coordinates are rounded once only.
+        """
+        return np.array(
+            [
+                self.ring.to_plane(a, b, self.denominator, factors)
+                for a, b in self.numerators.tolist()
+            ],
+            dtype=np.float64,
+        ).reshape(-1, 2)
@@ -0,0 +1,276 @@
+"""Local HTTP service of background images.
+
+A long-running asyncio server generates background images on demand, so that
+imports and tile geometry are paid for once per worker process rather than
+once per image. Images are requested as
+
+    GET /pattern/<name>?seed=<seed>&w=<width>&h=<height>
+
+returning an SVG, or a PNG if the name has a `.png` extension. Images are
+generated in a process pool, and finished images are kept in an LRU cache
+bounded by their total size. Concurrent requests of the same image share a
+single generation.
+
+Example:
+
+    python -m tilebg.server --port 8000
+    curl 'http://127.0.0.1:8000/pattern/hexagons.png?seed=7' > bg.png
+
+"""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (c) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["ResultCache", "WallpaperServer", "render"]
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import asyncio
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import traceback
+
+from . import patterns
+from .raster import render_png
+from .svg import generate_svg
+
+DEFAULT_CACHE_BYTES = 256 * 2**20
+
+MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+TKey = tuple[str, int, tuple[int, int], str]
+
+
+def render(
+    pattern: str, seed: int, resolution: tuple[int, int], image_format: str
+) -> bytes:
+    """Return the image of a pattern in `image_format` 'svg' or 'png'."""
+    is_png = image_format == "png"
+    parameters = patterns.load(pattern).parameters(
+        resolution=resolution,
+        seed=seed,
+        # Rasterization relies on tiles sharing their geometry
+        instancing=is_png,
+    )
+    if is_png:
+        file = io.BytesIO()
+        render_png(file, **parameters)
+        return file.getvalue()
+    return f"{generate_svg(**parameters)}\n".encode()
+
+
+class ResultCache:
+    """LRU cache of byte strings with a cap on their total size."""
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items: OrderedDict[Any, bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Any) -> bytes | None:
+        """Return the value of `key`, or `None` if it is not cached."""
+        value = self._items.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: bytes) -> None:
+        """Cache `value`, evicting the least recently used values.
+
+        Values larger than the total size cap are not cached at all.
+        """
+        if len(value) > self.max_bytes:
+            return
+        if key in self._items:
+            self.total_bytes -= len(self._items.pop(key))
+        self._items[key] = value
+        self.total_bytes += len(value)
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._items.popitem(last=False)
+            self.total_bytes -= len(evicted)
+
+
+class WallpaperServer:
+    """HTTP request handler generating images in a pool of `workers`.
+
+    The number of image generations started and that of requests joining a
+    pending generation of the same image are counted in `renders` and
+    `coalesced`, respectively. The server is a context manager shutting down
+    its pool on exit.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int | None = None,
+        cache_bytes: int = DEFAULT_CACHE_BYTES,
+    ) -> None:
+        # Forked workers would inherit, hence keep open, client connections
+        self.executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.cache = ResultCache(cache_bytes)
+        self.renders = 0
+        self.coalesced = 0
+        self._pending: dict[TKey, asyncio.Future[bytes]] = {}
+
+    def __enter__(self) -> "WallpaperServer":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.executor.shutdown()
+
+    async def start(self, host: str, port: int) -> asyncio.Server:
+        """Start serving on given `host` and `port` (0 for any free port)."""
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def image(self, key: TKey) -> bytes:
+        """Return the image of `key`, see `render()` for its items."""
+        image = self.cache.get(key)
+        if image is not None:
+            return image
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, render, *key)
+            future.add_done_callback(partial(self._finish, key))
+            self._pending[key] = future
+            self.renders += 1
+        else:
+            self.coalesced += 1
+        # A disconnecting client must not cancel the generation for the rest
+        return await asyncio.shield(future)
+
+    async def handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Answer a single HTTP request, then close the connection."""
+        try:
+            request_line = await reader.readline()
+            while await reader.readline() not in (b"\r\n", b"\n", b""):
+                pass
+            try:
+                status, media_type, body = await self._respond(request_line)
+            except Exception:
+                # E.g., a broken process pool, never leave the client waiting
+                traceback.print_exc()
+                status, media_type, body = _error(
+                    HTTPStatus.INTERNAL_SERVER_ERROR
+                )
+            head = (
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {media_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(head.encode("latin-1") + body)
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _respond(
+        self, request_line: bytes
+    ) -> tuple[HTTPStatus, str, bytes]:
+        """Return the status, media type and body of the response."""
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            return _error(HTTPStatus.BAD_REQUEST)
+        if method != "GET":
+            return _error(HTTPStatus.METHOD_NOT_ALLOWED)
+        url = urlsplit(target)
+        prefix, _, name = url.path.partition("/pattern/")
+        pattern, dot, extension = name.partition(".")
+        image_format = extension if dot else "svg"
+        if prefix or pattern not in patterns.PATTERNS:
+            return _error(HTTPStatus.NOT_FOUND)
+        if image_format not in MEDIA_TYPES:
+            return _error(HTTPStatus.NOT_FOUND)
+        query = parse_qs(url.query)
+        try:
+            seed, width, height = (
+                int(query.get(field, [default])[-1])
+                for field, default in [("seed", 1), ("w", 1920), ("h", 1200)]
+            )
+            if width <= 0 or height <= 0:
+                raise ValueError("non-positive resolution")
+            image = await self.image(
+                (pattern, seed, (width, height), image_format)
+            )
+        except ValueError:
+            # E.g., a resolution that is not a multiple of the cell spacing
+            return _error(HTTPStatus.BAD_REQUEST)
+        return HTTPStatus.OK, MEDIA_TYPES[image_format], image
+
+    def _finish(self, key: TKey, future: asyncio.Future[bytes]) -> None:
+        del self._pending[key]
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, future.result())
+
+
+def _error(status: HTTPStatus) -> tuple[HTTPStatus, str, bytes]:
+    return status, "text/plain", f"{status.phrase}\n".encode()
+
+
+async def _serve(host: str, port: int, workers: int, cache_bytes: int) -> None:
+    with WallpaperServer(workers=workers, cache_bytes=cache_bytes) as server:
+        async with await server.start(host, port) as http_server:
+            for socket in http_server.sockets:
+                host, port = socket.getsockname()[:2]
+                print(f"Serving on http://{host}:{port}/", file=sys.stderr)
+            await http_server.serve_forever()
+
+
+def main() -> None:
+    """Parse CLI arguments and serve background images until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="number of processes, 0 for one per CPU (default: 0)",
+    )
+    parser.add_argument(
+        "--cache-megabytes",
+        type=float,
+        default=DEFAULT_CACHE_BYTES / 2**20,
+        help="total size cap of cached images (default: 256)",
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(
+            _serve(
+                args.host,
+                args.port,
+                args.workers or os.cpu_count() or 1,
+                round(args.cache_megabytes * 2**20),
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,412 @@
-"""Dataclass and function for SVG generation."""
+"""Dataclasses and function for SVG generation."""
 
 __author__ = "ccornix"
 __copyright__ = "Copyright (c) 2024 ccornix"
 __license__ = "MIT"
-__all__ = ["SVGPath", "generate_svg"]
+__all__ = [
+    "MAX_DECIMALS",
+    "SVGPath",
+    "SVGPathTemplate",
+    "SVGPolylines",
+    "SVGSkeleton",
+    "SVGTile",
+    "SVGTileGrid",
+    "SVGUse",
+    "format_points",
+    "generate_svg",
+    "iter_svg",
+    "open_svg",
+    "write_svg",
+    "write_svg_chunks",
+]
 
-from collections.abc import Sequence
-from dataclasses import dataclass
-from sympy import Matrix
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass, replace
+from itertools import chain
+from numpy.typing import NDArray
+from pathlib import Path
+from typing import Any, TextIO, TypeAlias, overload
+import gzip
+import io
+import math
+import numpy as np
+import os
 
+from .functools import ordered_map
+from .instrument import count, stage, timed_iter
+from .path import TArray, TNum, TPath, as_array, is_closed, shift
 
-@dataclass(kw_only=True)
+# Largest number of decimals that floats carry for coordinates near one
+MAX_DECIMALS = 15
+
+# Significant digits of relative path data without explicit decimals
+_RELATIVE_DIGITS = 12
+
+
+def format_points(points: TPath, decimals: int | None = None) -> str:
+    """Return path points formatted as space-separated `x,y` pairs.
+
+    All coordinates are formatted at once by a single format operation. If
+    `decimals` is `None`, coordinates are written as the shortest strings
+    that read back as the same floats. Otherwise, they are rounded to given
+    number of decimals between 0 and `MAX_DECIMALS`, dropping trailing zeros
+    and writing negative zero as `0`.
+    """
+    array = as_array(points)
+    if decimals is None:
+        return " ".join(["%r,%r"] * len(array)) % tuple(array.ravel().tolist())
+    if not 0 <= decimals <= MAX_DECIMALS:
+        raise ValueError(f"decimals must be between 0 and {MAX_DECIMALS}")
+    # Adding zero turns negative zeros into positive ones
+    values = np.round(array.ravel(), decimals) + 0.0
+    if np.abs(values).max(initial=0.0) * 10.0**decimals >= 2**53:
+        # Beyond the integers exactly representable as floats
+        return " ".join(["%s,%s"] * len(array)) % tuple(
+            np.format_float_positional(value, precision=decimals, trim="-")
+            for value in values
+        )
+    # Each coordinate is formatted with as many decimals as its last nonzero
+    # one, counted from its integer multiple of the last decimal place
+    units = np.rint(values * 10.0**decimals).astype(np.int64)
+    precisions = np.full(len(values), decimals)
+    for i in range(decimals):
+        precisions -= units % 10 ** (i + 1) == 0
+    args: list[int | float] = [0] * (2 * len(values))
+    args[::2] = precisions.tolist()
+    args[1::2] = values.tolist()
+    return " ".join(["%.*f,%.*f"] * len(array)) % tuple(args)
+
+
+@dataclass(kw_only=True, eq=False)
 class SVGPath:
     """Representation of an SVG path."""
 
-    points: list[Matrix]
+    points: TPath
     svg_class: list[str]
+    id: str | None = None
+    decimals: int | None = None
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, SVGPath):
+            return NotImplemented
+        return (
+            self.svg_class == other.svg_class
+            and self.id == other.id
+            and self.decimals == other.decimals
+            and np.array_equal(as_array(self.points), as_array(other.points))
+        )
 
     def __str__(self) -> str:
-        """Return an SVG XML string representation."""
-        is_closed = self.points[-1] == self.points[0]
-        if is_closed:
+        """Return an SVG XML string representation.
+
+        Coordinates are rounded to `decimals`, see `format_points()`.
+        """
+        if is_closed(self.points):
             points = self.points[:-1]
             suffix = " z"
         else:
             points = self.points
             suffix = ""
-        points_str = " ".join(f"{float(p[0])},{float(p[1])}" for p in points)
+        points_str = format_points(points, self.decimals)
+        id_str = "" if self.id is None else f'id="{self.id}" '
+        svg_class_str = " ".join(self.svg_class)
+        return (
+            f'<path {id_str}class="{svg_class_str}" '
+            f'd="M {points_str}{suffix}"/>'
+        )
+
+
+@dataclass(kw_only=True)
+class SVGPolylines:
+    """Representation of an unfilled SVG path of open polylines.
+
+    Each item of `polylines` is a separate subpath, e.g., a run of edges of a
+    stroke layer. Coordinates are rounded to `decimals`, see
+    `format_points()`.
+    """
+
+    polylines: Sequence[TPath]
+    svg_class: list[str]
+    decimals: int | None = None
+
+    def __str__(self) -> str:
+        """Return an SVG XML string representation."""
+        d_str = " ".join(
+            f"M {format_points(points, self.decimals)}"
+            for points in self.polylines
+        )
         svg_class_str = " ".join(self.svg_class)
-        return f'<path class="{svg_class_str}" d="M {points_str}{suffix}"/>'
+        return f'<path class="{svg_class_str}" fill="none" d="{d_str}"/>'
+
+
+@dataclass(frozen=True)
+class SVGPathTemplate:
+    """Precompiled path data of a path to be shifted to different positions.
+
+    The path is compiled once into an absolute initial point and a string of
+    relative line-to commands. Path data at given offsets then only require
+    formatting a single move-to command. Coordinates are rounded to
+    `decimals`, see `format_points()`.
+    """
+
+    start: tuple[float, float]
+    relative_str: str
+    decimals: int | None = None
+
+    @classmethod
+    def compile(
+        cls, points: TPath, decimals: int | None = None
+    ) -> "SVGPathTemplate":
+        """Compile path data from path points.
+
+        The relative moves are the differences of the points rounded to
+        `decimals`, so that rounding errors do not accumulate. Without
+        `decimals`, points are rounded to 12 significant digits of the
+        extent of the path, as the differences of floats would otherwise be
+        written with round-off noise.
+        """
+        array = as_array(points)
+        closed = is_closed(points)
+        if closed:
+            array = array[:-1]
+        if decimals is None:
+            extent = float(np.abs(array).max(initial=0.0))
+            digits = math.floor(math.log10(extent)) + 1 if extent > 0 else 0
+            places = _RELATIVE_DIGITS - digits
+            array = np.round(array, places)
+            moves = np.round(np.diff(array, axis=0), places)
+        else:
+            array = np.round(array, decimals)
+            moves = np.diff(array, axis=0)
+        relative_str = format_points(moves, decimals)
+        if relative_str:
+            relative_str = f" l {relative_str}"
+        if closed:
+            relative_str = f"{relative_str} z"
+        x, y = array[0].tolist()
+        return cls((x, y), relative_str, decimals)
+
+    def format(self, offsets: tuple[TNum, TNum]) -> str:
+        """Return path data of the path shifted by given `offsets`."""
+        x0, y0 = self.start
+        dx, dy = offsets
+        x, y = x0 + float(dx), y0 + float(dy)
+        if self.decimals is None:
+            return f"m {x},{y}{self.relative_str}"
+        start_str = format_points(np.array([(x, y)]), self.decimals)
+        return f"m {start_str}{self.relative_str}"
+
+
+@dataclass(kw_only=True)
+class SVGUse:
+    """Representation of an SVG use element instancing a shared SVG path.
+
+    The shared `element` path must have an `id`. It is written once into a
+    `<defs>` section, then each instance only consists of its `offsets` and
+    its SVG class. Offsets are rounded to `decimals`, see `format_points()`.
+    """
+
+    element: SVGPath
+    offsets: tuple[TNum, TNum]
+    svg_class: list[str]
+    decimals: int | None = None
+
+    def __str__(self) -> str:
+        """Return an SVG XML string representation."""
+        assert self.element.id is not None
+        x, y = self.offsets
+        offsets = np.array([(float(x), float(y))])
+        x_str, y_str = format_points(offsets, self.decimals).split(",")
+        svg_class_str = " ".join(self.svg_class)
+        return (
+            f'<use class="{svg_class_str}" xlink:href="#{self.element.id}" '
+            f'x="{x_str}" y="{y_str}"/>'
+        )
+
+
+class SVGTile:
+    """Compact representation of a shifted copy of a shared SVG path.
+
+    Instead of its own points, a tile only stores a reference to the shared
+    `element_path`, its `offsets` and an index into the shared sequence of
+    distinct `svg_classes`. It compares equal to, and unless a shared path
+    `template` is given, is serialized the same as, the `SVGPath` it
+    represents, with coordinates rounded to `decimals`. The element path is
+    shifted exactly with given `denominators`, see `shift()`.
+    """
+
+    __slots__ = (
+        "element_path",
+        "offsets",
+        "class_index",
+        "svg_classes",
+        "template",
+        "decimals",
+        "denominators",
+    )
+
+    def __init__(
+        self,
+        *,
+        element_path: TPath,
+        offsets: tuple[TNum, TNum],
+        class_index: int,
+        svg_classes: Sequence[Sequence[str]],
+        template: SVGPathTemplate | None = None,
+        decimals: int | None = None,
+        denominators: tuple[int, int] | None = None,
+    ) -> None:
+        self.element_path = element_path
+        self.offsets = offsets
+        self.class_index = class_index
+        self.svg_classes = svg_classes
+        self.template = template
+        self.decimals = decimals
+        self.denominators = denominators
+
+    @property
+    def points(self) -> TPath:
+        """Return the points of the shifted element path."""
+        return shift(
+            self.element_path, self.offsets, denominators=self.denominators
+        )
+
+    @property
+    def svg_class(self) -> list[str]:
+        """Return the SVG class of the tile."""
+        return list(self.svg_classes[self.class_index])
+
+    def to_svg_path(self) -> SVGPath:
+        """Return the equivalent SVG path."""
+        return SVGPath(
+            points=self.points,
+            svg_class=self.svg_class,
+            decimals=self.decimals,
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, SVGTile | SVGPath):
+            return NotImplemented
+        return self.svg_class == other.svg_class and np.array_equal(
+            as_array(self.points), as_array(other.points)
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"SVGTile(offsets={self.offsets!r}, "
+            f"svg_class={self.svg_class!r})"
+        )
+
+    def __str__(self) -> str:
+        """Return an SVG XML string representation."""
+        if self.template is None:
+            return str(self.to_svg_path())
+        svg_class_str = " ".join(self.svg_classes[self.class_index])
+        d_str = self.template.format(self.offsets)
+        return f'<path class="{svg_class_str}" d="{d_str}"/>'
+
+
+@dataclass(kw_only=True, eq=False)
+class SVGTileGrid(Sequence[SVGTile]):
+    """Array-backed representation of a whole grid of `SVGTile` objects.
+
+    Row `i` of the `(N, 2)` array `offsets` and item `i` of `class_indices`
+    describe tile `i`, whose SVG class is looked up in `svg_classes`. An
+    optional path `template` is shared by all tiles for serialization. If
+    given, row `i` of the `(N, 2)` array `cells` holds the indices of the
+    periodic cell of tile `i`, and the grid repeats itself after `periods`
+    cells in the horizontal and vertical directions. Tiles round their
+    coordinates to `decimals` and are shifted with `denominators`.
+    """
+
+    element_path: TPath
+    offsets: TArray
+    class_indices: NDArray[np.unsignedinteger]
+    svg_classes: list[tuple[str, ...]]
+    template: SVGPathTemplate | None = None
+    cells: NDArray[np.int64] | None = None
+    periods: tuple[int, int] | None = None
+    decimals: int | None = None
+    denominators: tuple[int, int] | None = None
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    @overload
+    def __getitem__(self, index: int) -> SVGTile: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Sequence[SVGTile]: ...
+
+    def __getitem__(self, index: int | slice) -> SVGTile | Sequence[SVGTile]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(len(self))[index]]
+        x, y = self.offsets[index].tolist()
+        return SVGTile(
+            element_path=self.element_path,
+            offsets=(x, y),
+            class_index=int(self.class_indices[index]),
+            svg_classes=self.svg_classes,
+            template=self.template,
+            decimals=self.decimals,
+            denominators=self.denominators,
+        )
+
+
+SVGElement: TypeAlias = SVGPath | SVGPolylines | SVGUse | SVGTile
+
+
+@dataclass(frozen=True)
+class SVGSkeleton:
+    """SVG code of a tile grid split at the SVG classes of its tiles.
+
+    Item `i` of `fragments` precedes the class of tile `i` in the code, while
+    the last item follows the class of the last tile. Recolored variants of
+    the grid then only require joining the fragments with new classes, see
+    `format()`.
+    """
+
+    fragments: tuple[str, ...]
+
+    @classmethod
+    def compile(
+        cls,
+        *,
+        author: str,
+        title: str,
+        resolution: tuple[int, int],
+        paths: SVGTileGrid,
+    ) -> "SVGSkeleton":
+        """Compile the skeleton of the SVG code of the wallpaper.
+
+        See `generate_svg()` for the arguments.
+        """
+        # Never part of valid XML, hence of the rest of the code
+        placeholder = "\0"
+        placeholder_grid = replace(
+            paths,
+            class_indices=np.zeros(len(paths), dtype=np.uint8),
+            svg_classes=[(placeholder,)],
+        )
+        fragments = generate_svg(
+            author=author,
+            title=title,
+            resolution=resolution,
+            paths=placeholder_grid,
+        ).split(placeholder)
+        assert len(fragments) == len(paths) + 1
+        return cls(tuple(fragments))
+
+    def format(self, grid: SVGTileGrid) -> str:
+        """Return the SVG code with the SVG classes of the tiles of `grid`."""
+        assert len(grid) == len(self.fragments) - 1
+        svg_class_strs = [" ".join(c) for c in grid.svg_classes]
+        tile_class_strs = [
+            svg_class_strs[i] for i in grid.class_indices.tolist()
+        ]
+        count("tiles_recolored", len(grid))
+        chunks = chain.from_iterable(zip(self.fragments, tile_class_strs))
+        return "".join(chain(chunks, self.fragments[-1:]))
 
 
 def generate_svg(
@@ -36,7 +414,7 @@ def generate_svg(
     author: str,
     title: str,
     resolution: tuple[int, int],
-    paths: Sequence[SVGPath],
+    paths: Iterable[SVGElement],
 ) -> str:
     """Generate the SVG code of the wallpaper.
 
@@ -46,14 +424,151 @@ def generate_svg(
     A sequence of SVG paths that compose the wallpaper are contained in
     `paths`. The desired nominal resolution of the SVG in pixels is given by
     `resolution`. This is independent of the final PNG resolution that can be a
-    multiple of this nominal one.
+    multiple of this nominal one. Shared paths of SVG use elements are defined
+    right before their first instance.
+    """
+    return "".join(
+        iter_svg(
+            author=author, title=title, resolution=resolution, paths=paths
+        )
+    )
+
+
+def iter_svg(
+    *,
+    author: str,
+    title: str,
+    resolution: tuple[int, int],
+    paths: Iterable[SVGElement],
+) -> Iterator[str]:
+    """Return an iterator over chunks of the SVG code of the wallpaper.
+
+    The header, each path and the footer are yielded as soon as they are
+    produced, see `generate_svg()` for the arguments. Joining all chunks
+    results in the same code that `generate_svg()` returns.
     """
     width, height = resolution
-    paths_str = "\n".join(str(path) for path in paths)
-    return SVG_TEMPLATE.format(**locals())
+    header = SVG_HEADER_TEMPLATE.format(**locals())
+    count("bytes", len(header))
+    yield header
+    is_empty = True
+    for element_str in timed_iter(
+        "serialization", _element_strs(timed_iter("layout", paths))
+    ):
+        is_empty = False
+        count("bytes", len(element_str) + 1)
+        yield f"{element_str}\n"
+    if is_empty:
+        count("bytes")
+        yield "\n"
+    count("bytes", len(SVG_FOOTER))
+    yield SVG_FOOTER
+
+
+def write_svg(
+    file: TextIO,
+    *,
+    author: str,
+    title: str,
+    resolution: tuple[int, int],
+    paths: Iterable[SVGElement],
+) -> None:
+    """Write the SVG code of the wallpaper to a text `file` incrementally.
+
+    See `generate_svg()` for the rest of the arguments.
+    """
+    file.writelines(
+        iter_svg(
+            author=author, title=title, resolution=resolution, paths=paths
+        )
+    )
 
 
-SVG_TEMPLATE = """\
+def open_svg(path: str | Path, *, compress_level: int = 6) -> TextIO:
+    """Open an SVG file at `path` for writing text.
+
+    If the extension of `path` is `.svgz`, the text is gzip-compressed with
+    given `compress_level` incrementally as it is written. The modification
+    time is left out of the gzip header, so that the same SVG code always
+    results in the same file.
+    """
+    if Path(path).suffix != ".svgz":
+        return open(path, "w", encoding="utf-8")
+    binary_file = gzip.GzipFile(
+        path, mode="wb", compresslevel=compress_level, mtime=0
+    )
+    return io.TextIOWrapper(binary_file, encoding="utf-8")
+
+
+def write_svg_chunks(
+    file: TextIO,
+    *,
+    author: str,
+    title: str,
+    resolution: tuple[int, int],
+    paths_fn: Callable[[tuple[int, int]], Iterable[SVGElement]],
+    chunk_count: int,
+    workers: int | None = 1,
+) -> None:
+    """Write the SVG code of the wallpaper generated in chunks of paths.
+
+    Function `paths_fn` returns the paths of chunk `i` given `(i,
+    chunk_count)`, e.g., rows of a grid, see `iter_grid()`. Chunks are
+    generated and serialized independently, with more than one `workers` (or
+    `None` for one per CPU) in a process pool, which requires `paths_fn` to be
+    picklable. They are written in order as soon as they are ready, resulting
+    in the same code that `write_svg()` writes for the concatenated chunks.
+    See `generate_svg()` for the rest of the arguments.
+    """
+    width, height = resolution
+    header = SVG_HEADER_TEMPLATE.format(**locals())
+    count("bytes", len(header))
+    file.write(header)
+    tasks = ((paths_fn, (i, chunk_count)) for i in range(chunk_count))
+    defined_strs: set[str] = set()
+    is_empty = True
+    with stage("serialization"):
+        for chunk_str, defs_strs in ordered_map(
+            _chunk_str, tasks, workers=workers or os.cpu_count() or 1
+        ):
+            # Shared paths are only defined before their very first instance
+            for defs_str in defs_strs:
+                if defs_str in defined_strs:
+                    chunk_str = chunk_str.replace(defs_str, "", 1)
+                defined_strs.add(defs_str)
+            is_empty = is_empty and not chunk_str
+            count("bytes", len(chunk_str))
+            file.write(chunk_str)
+    if is_empty:
+        count("bytes")
+        file.write("\n")
+    count("bytes", len(SVG_FOOTER))
+    file.write(SVG_FOOTER)
+
+
+def _chunk_str(
+    task: tuple[
+        Callable[[tuple[int, int]], Iterable[SVGElement]], tuple[int, int]
+    ],
+) -> tuple[str, list[str]]:
+    """Return the code of a chunk of paths and its shared path definitions."""
+    paths_fn, chunk = task
+    element_strs = [f"{s}\n" for s in _element_strs(paths_fn(chunk))]
+    defs_strs = [s for s in element_strs if s.startswith("<defs>")]
+    return "".join(element_strs), defs_strs
+
+
+def _element_strs(elements: Iterable[SVGElement]) -> Iterator[str]:
+    defined_ids: set[str] = set()
+    for element in elements:
+        if isinstance(element, SVGUse) and element.element.id is not None:
+            if element.element.id not in defined_ids:
+                defined_ids.add(element.element.id)
+                yield f"<defs>{element.element}</defs>"
+        yield str(element)
+
+
+SVG_HEADER_TEMPLATE = """\
 <?xml version="1.0" encoding="UTF-8"?>
 <svg
   version="1.1"
@@ -73,6 +588,8 @@ SVG_TEMPLATE = """\
 </style>
 <!-- Flip the y axis and move the origin to the bottom left corner -->
 <g transform="translate(0,{height}) scale(1,-1)">
-{paths_str}
+"""
+
+SVG_FOOTER = """\
 </g>
 </svg>"""
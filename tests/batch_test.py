@@ -0,0 +1,65 @@
+"""Unit tests for module `lib.batch`."""
+
+from pathlib import Path
+import json
+
+from tilebg.batch import Job, load_manifest, product_jobs, run_batch
+
+
+def test_product_jobs() -> None:
+    """Test the cartesian product of job parameters and output names."""
+    jobs = product_jobs(
+        patterns=["hexagons"],
+        seeds=[1, 2],
+        resolutions=[(960, 600)],
+        cell_sizes=[None, (60, 64)],
+        output_dir=Path("out"),
+        name_template="{pattern}-{seed}-{cell_width}.png",
+    )
+    assert [job.output for job in jobs] == [
+        Path("out/hexagons-1-.png"),
+        Path("out/hexagons-1-60.png"),
+        Path("out/hexagons-2-.png"),
+        Path("out/hexagons-2-60.png"),
+    ]
+    assert all(job.is_png for job in jobs)
+    assert jobs[1].cell_size == (60, 64)
+
+
+def test_load_manifest(tmp_path: Path) -> None:
+    """Test that manifest entries are converted into jobs."""
+    manifest = tmp_path / "jobs.json"
+    manifest.write_text(
+        json.dumps(
+            [
+                {
+                    "pattern": "hexagons",
+                    "resolution": [960, 600],
+                    "output": "a.svg",
+                }
+            ]
+        )
+    )
+    assert load_manifest(manifest) == [
+        Job(
+            pattern="hexagons",
+            resolution=(960, 600),
+            output=tmp_path / "a.svg",
+        )
+    ]
+
+
+def test_run_batch(tmp_path: Path) -> None:
+    """Test that results depend on the seed only, not on the process."""
+    jobs = [
+        Job(pattern="hexagons", seed=seed, output=tmp_path / f"{i}.svg")
+        for i, seed in enumerate([1, 2, 1])
+    ]
+    assert list(run_batch(jobs, workers=2)) == [job.output for job in jobs]
+    first, second, third = (job.output.read_text() for job in jobs)
+    assert first == third
+    assert first != second
+    (serial,) = run_batch(
+        [Job(pattern="hexagons", output=tmp_path / "serial.svg")], workers=1
+    )
+    assert serial.read_text() == first
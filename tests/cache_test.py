@@ -0,0 +1,76 @@
+"""Unit tests for module `lib.cache`."""
+
+from pathlib import Path
+import numpy as np
+import pytest
+
+from tilebg import cache as cache_module
+from tilebg.cache import GeometryCache, cached_island
+from tilebg.path import TArray
+
+
+def build(iterations: int) -> TArray:
+    return np.full((iterations, 2), 1.0)
+
+
+def test_cache_hit(tmp_path: Path) -> None:
+    """Test that a cached entry is memory-mapped instead of rebuilt."""
+    cache = GeometryCache(directory=tmp_path, version="1")
+    points = cache.get_or_build("island", 3, build)
+    np.testing.assert_array_equal(points, build(3))
+
+    def failing_build(iterations: int) -> TArray:
+        raise AssertionError("unexpected cache miss")
+
+    cached = cache.get_or_build("island", 3, failing_build)
+    assert isinstance(cached, np.memmap)
+    np.testing.assert_array_equal(cached, points)
+
+
+def test_version_invalidation(tmp_path: Path) -> None:
+    """Test that entries of other versions are removed."""
+    GeometryCache(directory=tmp_path, version="1").get_or_build(
+        "island", 3, build
+    )
+    GeometryCache(directory=tmp_path, version="2").get_or_build(
+        "island", 3, build
+    )
+    assert [path.name for path in tmp_path.iterdir()] == ["island-3@2.npy"]
+
+
+def test_eviction(tmp_path: Path) -> None:
+    """Test that least recently used entries are evicted above the cap."""
+    cache = GeometryCache(directory=tmp_path, max_bytes=400, version="1")
+    cache.get_or_build("a", 4, build)
+    cache.get_or_build("b", 4, build)
+    assert len(list(tmp_path.iterdir())) == 2
+    cache.get_or_build("c", 4, build)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "b-4@1.npy",
+        "c-4@1.npy",
+    ]
+
+
+def test_failed_store(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a failed write leaves no temporary file behind."""
+
+    def failing_save(*_: object) -> None:
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "save", failing_save)
+    cache = GeometryCache(directory=tmp_path, version="1")
+    np.testing.assert_array_equal(cache.get_or_build("a", 4, build), build(4))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cached_island(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that islands are restored exactly from the cache."""
+    cache = GeometryCache(directory=tmp_path, version="1")
+    monkeypatch.setattr(cache_module, "_cache", cache)
+    built = cached_island("minkowski", 2)
+    cached = cached_island("minkowski", 2)
+    assert isinstance(cached.numerators, np.memmap)
+    assert (cached.ring, cached.denominator) == (built.ring, built.denominator)
+    np.testing.assert_array_equal(cached.numerators, built.numerators)
@@ -0,0 +1,49 @@
+"""Unit tests for module `lib.functools`."""
+
+from sympy import Matrix
+import numpy as np
+import pytest
+
+from tilebg.functools import memoization_stats, memoized
+
+
+@memoized(maxsize=2)
+def matrices(n: int) -> list[Matrix]:
+    return [Matrix([i, n]) for i in range(n)]
+
+
+@memoized(maxsize=2)
+def array(n: int) -> np.ndarray:
+    return np.zeros(n)
+
+
+@memoized(maxsize=2)
+def matrix_pair(n: int) -> tuple[Matrix, list[Matrix]]:
+    return Matrix([n, n]), [Matrix([n, 0])]
+
+
+def test_memoization_stats() -> None:
+    """Test that hits and misses are counted within the size bound."""
+    matrices.cache_clear()
+    matrices(1)
+    matrices(1)
+    matrices(2)
+    matrices(3)
+    matrices(1)
+    info = memoization_stats()[f"{__name__}.matrices"]
+    assert (info.hits, info.misses, info.currsize) == (1, 4, 2)
+
+
+def test_frozen_results() -> None:
+    """Test that callers cannot alter memoized results."""
+    result = matrices(2)
+    result.append(Matrix([0, 0]))
+    assert matrices(2) == [Matrix([0, 2]), Matrix([1, 2])]
+    assert not array(2).flags.writeable
+    pair = matrix_pair(1)
+    assert isinstance(pair, tuple)
+    assert isinstance(pair[1], list)
+    with pytest.raises(TypeError):
+        pair[0][0] = 99
+    pair[1].clear()
+    assert matrix_pair(1) == (Matrix([1, 1]), [Matrix([1, 0])])
@@ -1,10 +1,19 @@
 """Unit tests for module `lib.grid`."""
 
-from sympy import Matrix
+from sympy import Matrix, Rational
 
-from tilebg.grid import generate_grid
-from tilebg.path import shift
-from tilebg.svg import SVGPath
+from tilebg import patterns
+from tilebg.grid import (
+    generate_compact_grid,
+    generate_grid,
+    iter_grid,
+    make_hashed_fill_svg_class_fn,
+    make_odd_row_shift_offsets_fn,
+    recolor,
+)
+from tilebg.path import scale, shift
+from tilebg.raster import render
+from tilebg.svg import SVGPath, SVGPolylines, SVGUse
 
 
 def test_rectangular_grid() -> None:
@@ -43,3 +52,228 @@ def test_rectangular_grid() -> None:
         SVGPath(points=shift(rectangle, Matrix([4, 4])), svg_class=["test-1"]),
         SVGPath(points=shift(rectangle, Matrix([8, 4])), svg_class=["test-0"]),
     ]
+
+
+# Element path and classes of the rectangular grid shared by the tests below
+RECTANGLE = [
+    Matrix([-2, -1]),
+    Matrix([2, -1]),
+    Matrix([2, 1]),
+    Matrix([-2, 1]),
+    Matrix([-2, -1]),
+]
+
+
+def cell_svg_class_fn(ix: int, iy: int) -> list[str]:
+    return [f"test-{(3 * iy + ix) % 4}"]
+
+
+def test_instanced_grid() -> None:
+    """Test that an instanced grid shares the element path among tiles."""
+    tiles = generate_grid(
+        element_path=RECTANGLE,
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=None,
+        svg_class_fn=cell_svg_class_fn,
+        instancing=True,
+    )
+
+    assert all(isinstance(tile, SVGUse) for tile in tiles)
+    assert len({id(tile.element) for tile in tiles}) == 1
+    assert [(tile.offsets, tile.svg_class) for tile in tiles] == [
+        ((0, 0), ["test-0"]),
+        ((4, 0), ["test-1"]),
+        ((8, 0), ["test-0"]),
+        ((0, 2), ["test-3"]),
+        ((4, 2), ["test-0"]),
+        ((8, 2), ["test-3"]),
+        ((0, 4), ["test-0"]),
+        ((4, 4), ["test-1"]),
+        ((8, 4), ["test-0"]),
+    ]
+
+
+def test_viewport_culling() -> None:
+    """Test that exactly the tiles overlapping the image are generated."""
+    paths = generate_grid(
+        element_path=scale(RECTANGLE, (Rational(3, 2), 1)),
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=make_odd_row_shift_offsets_fn(2),
+        svg_class_fn=cell_svg_class_fn,
+    )
+    offsets = [
+        (float(p.points[0][0]) + 3, float(p.points[0][1]) + 1) for p in paths
+    ]
+    assert offsets == [
+        (0, 0), (4, 0), (8, 0),
+        (-2, 2), (2, 2), (6, 2), (10, 2),
+        (0, 4), (4, 4), (8, 4),
+    ]  # fmt: skip
+    # Tiles wrapping around the edges repeat the classes of the other edge
+    assert paths[3].svg_class == paths[5].svg_class
+    assert paths[4].svg_class == paths[6].svg_class
+    assert paths[7:] == [
+        SVGPath(points=shift(p.points, (0, 4)), svg_class=p.svg_class)
+        for p in paths[:3]
+    ]
+
+
+def test_lazy_grid() -> None:
+    """Test that tiles are computed on demand in row order."""
+    calls = []
+
+    def recording_svg_class_fn(ix: int, iy: int) -> list[str]:
+        calls.append((ix, iy))
+        return cell_svg_class_fn(ix, iy)
+
+    kwargs = dict(
+        element_path=RECTANGLE,
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=None,
+    )
+    tiles = iter_grid(svg_class_fn=recording_svg_class_fn, **kwargs)
+    assert calls == []
+    first = next(tiles)
+    assert calls == [(0, 0)]
+    assert [first, *tiles] == generate_grid(
+        svg_class_fn=cell_svg_class_fn, **kwargs
+    )
+    # Wrapped tiles on the last row and column reuse the edge classes
+    assert len(calls) == 4
+
+
+def test_compact_grid() -> None:
+    """Test that a compact grid matches the grid of full SVG paths."""
+    kwargs = dict(
+        element_path=RECTANGLE,
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=None,
+        svg_class_fn=cell_svg_class_fn,
+    )
+    tiles = generate_compact_grid(**kwargs)
+    paths = generate_grid(**kwargs)
+
+    assert tiles.offsets.shape == (9, 2)
+    assert tiles.svg_classes == [("test-0",), ("test-1",), ("test-3",)]
+    assert tiles.class_indices.tolist() == [0, 1, 0, 2, 0, 2, 0, 1, 0]
+    assert list(tiles) == paths
+    assert [str(tile) for tile in tiles] == [str(path) for path in paths]
+
+
+def test_recolor() -> None:
+    """Test that a recolored grid equals one generated from scratch."""
+    kwargs = dict(
+        element_path=scale(RECTANGLE, (Rational(3, 2), 1)),
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=make_odd_row_shift_offsets_fn(2),
+    )
+    tiles = generate_compact_grid(svg_class_fn=cell_svg_class_fn, **kwargs)
+    assert tiles.periods == (2, 2)
+
+    def other_svg_class_fn(ix: int, iy: int) -> list[str]:
+        return [f"other-{ix}-{iy}"]
+
+    recolored = recolor(tiles, other_svg_class_fn)
+    assert recolored.element_path is tiles.element_path
+    assert list(recolored) == generate_grid(
+        svg_class_fn=other_svg_class_fn, **kwargs
+    )
+
+
+def test_simplified_grid() -> None:
+    """Test that the element path is simplified once for every tile."""
+    subdivided = RECTANGLE[:1] + [Matrix([0, -1])] + RECTANGLE[1:]
+    tiles = generate_compact_grid(
+        element_path=subdivided,
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=None,
+        svg_class_fn=cell_svg_class_fn,
+        simplify_tolerance=0,
+    )
+    assert tiles.element_path == RECTANGLE
+
+
+def test_simplified_tiling() -> None:
+    """Test that simplified tiles still cover the image without gaps."""
+    styles = {f"fill-{i}": {"fill": "#ffffff"} for i in range(3)}
+    for name in ["gosperflakes2", "minkowskiflakes4"]:
+        parameters = patterns.load(name).parameters(
+            resolution=(240, 240), instancing=True, simplify_tolerance=3
+        )
+        image = render(**parameters, styles=styles)
+        # Pixels on seams are covered by both adjacent tiles
+        assert (image[..., 3] >= 128).all()
+
+
+def test_shared_edges() -> None:
+    """Test that edges shared by adjacent tiles are stroked only once."""
+    *tiles, stroke = generate_grid(
+        element_path=RECTANGLE,
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=None,
+        svg_class_fn=lambda ix, iy: ["stroke", "fill-0"],
+        shared_edges=True,
+    )
+    assert len(tiles) == 9
+    assert all(tile.svg_class == ["fill-0"] for tile in tiles)
+    assert isinstance(stroke, SVGPolylines)
+    assert stroke.svg_class == ["stroke"]
+    # A 3x3 grid of rectangles has 3x4 horizontal and 4x3 vertical edges
+    edges = {
+        tuple(sorted([tuple(a), tuple(b)]))
+        for polyline in stroke.polylines
+        for a, b in zip(polyline[:-1].tolist(), polyline[1:].tolist())
+    }
+    assert sum(len(polyline) - 1 for polyline in stroke.polylines) == 24
+    assert len(edges) == 24
+
+
+def test_relative_grid() -> None:
+    """Test that relative tiles only differ in their initial point."""
+    tiles = generate_grid(
+        element_path=RECTANGLE,
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=None,
+        svg_class_fn=cell_svg_class_fn,
+        relative=True,
+    )
+    assert str(tiles[4]) == (
+        '<path class="test-0" d="m 2.0,1.0 l 4.0,0.0 0.0,2.0 -4.0,0.0 z"/>'
+    )
+    assert tiles[4] == SVGPath(
+        points=shift(RECTANGLE, (4, 2)), svg_class=["test-0"]
+    )
+
+
+def test_hashed_fill() -> None:
+    """Test that hashed fills depend on the seed and indices only."""
+    cells = [(jx, jy) for jy in range(8) for jx in range(8)]
+    fills = [make_hashed_fill_svg_class_fn(3, seed=7)(*c) for c in cells]
+    svg_class_fn = make_hashed_fill_svg_class_fn(3, seed=7)
+    assert [svg_class_fn(*c) for c in reversed(cells)] == fills[::-1]
+    assert {fill for _, fill in fills} == {"fill-0", "fill-1", "fill-2"}
+
+    other_fills = [make_hashed_fill_svg_class_fn(3, seed=8)(*c) for c in cells]
+    assert other_fills != fills
+
+
+def test_row_chunks() -> None:
+    """Test that chunks of rows concatenate into the whole grid."""
+    options = dict(
+        element_path=RECTANGLE,
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=make_odd_row_shift_offsets_fn(2),
+        svg_class_fn=cell_svg_class_fn,
+    )
+    chunks = [generate_grid(**options, row_chunk=(i, 4)) for i in range(4)]
+    assert len([chunk for chunk in chunks if chunk]) > 1
+    assert sum(chunks, []) == generate_grid(**options)
@@ -0,0 +1,38 @@
+"""Unit tests for module `lib.instrument`."""
+
+from collections.abc import Iterator
+import time
+
+from tilebg import instrument
+
+
+def slow_items(n: int) -> Iterator[int]:
+    for i in range(n):
+        time.sleep(0.01)
+        yield i
+
+
+def test_disabled_passthrough() -> None:
+    """Test that disabled instrumentation neither wraps nor counts."""
+    instrument.reset()
+    items = [1, 2]
+    assert instrument.timed_iter("stage", items) is items
+    instrument.count("tiles")
+    assert instrument.report()["counters"] == {}
+
+
+def test_exclusive_stage_times() -> None:
+    """Test that nested stages are only accounted to the innermost one."""
+    instrument.reset()
+    instrument.enable()
+    try:
+        with instrument.stage("outer"):
+            items = instrument.timed_iter("inner", slow_items(3))
+            for _ in items:
+                instrument.count("tiles")
+    finally:
+        instrument.disable()
+    report = instrument.report()
+    assert report["counters"] == {"tiles": 3}
+    assert report["seconds"]["inner"] >= 0.03
+    assert report["seconds"]["outer"] < 0.01
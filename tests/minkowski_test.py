@@ -0,0 +1,22 @@
+"""Unit tests for module `lib.minkowski`."""
+
+import numpy as np
+
+from tilebg.minkowski import minkowski_island, minkowski_ring_island
+from tilebg.path import as_array, is_closed
+
+
+def test_numeric_island() -> None:
+    """Test that the numeric island agrees with the exact one."""
+    exact = as_array(minkowski_island(2, backend="sympy"))
+    numeric = minkowski_island(2, backend="numpy")
+    assert is_closed(numeric)
+    np.testing.assert_allclose(numeric, exact, atol=1e-12)
+
+
+def test_ring_island() -> None:
+    """Test that the island derived in integers agrees with the exact one."""
+    exact = as_array(minkowski_island(2, backend="sympy"))
+    island = minkowski_ring_island(2)
+    assert island.is_closed()
+    np.testing.assert_allclose(island.as_array(), exact, rtol=0, atol=1e-15)
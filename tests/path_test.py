@@ -1,8 +1,15 @@
 """Unit tests for module `lib.path`."""
 
+from fractions import Fraction
 from sympy import Matrix, Rational, pi, sqrt
+import numpy as np
 
 from tilebg.path import (
+    as_array,
+    as_matrices,
+    batch_refined_segments,
+    common_denominators,
+    is_closed,
     points_to_segments,
     refined_segments,
     regular_polygon_path,
@@ -10,6 +17,8 @@ from tilebg.path import (
     scale,
     segments_to_points,
     shift,
+    simplify,
+    transform_stack,
 )
 
 
@@ -118,6 +127,23 @@ def test_division_refinement() -> None:
     ]
 
 
+def test_batch_refinement() -> None:
+    """Test that batched refinement agrees with the segment-wise one."""
+    T = Matrix([[Rational(1, 2), 0], [0, Rational(1, 2)]])
+    R = Matrix([[0, -1], [1, 0]])
+
+    def rule(seg: Matrix) -> list[Matrix]:
+        return [T * seg, R * T * seg]
+
+    segments = points_to_segments(points)
+    np.testing.assert_array_equal(
+        batch_refined_segments(
+            as_array(segments), transform_stack([T, R * T])
+        ),
+        as_array(list(refined_segments(segments, rule))),
+    )
+
+
 def test_triangle() -> None:
     """Test path triangular path generation."""
     assert regular_polygon_path(3) == [
@@ -150,3 +176,96 @@ def test_hexagon() -> None:
         Matrix([-sqrt(3) / 2, Rational(1, 2)]),
         Matrix([0, 1]),
     ]
+
+
+def test_array_conversion() -> None:
+    """Test converting path points between both backends."""
+    array = as_array(points)
+    assert array.dtype == np.float64
+    assert array.shape == (5, 2)
+    np.testing.assert_array_equal(as_array(as_matrices(array)), array)
+
+
+def test_numpy_points_segments_conversion() -> None:
+    """Test segment conversion roundtrip with the numpy backend."""
+    array = as_array(points)
+    segments = points_to_segments(array)
+    np.testing.assert_array_equal(segments, [[4, 0], [0, 2], [-4, 0], [0, -2]])
+    np.testing.assert_array_equal(
+        segments_to_points(segments, array[0]), array
+    )
+
+
+def test_numpy_transformations() -> None:
+    """Test that the numpy backend agrees with the sympy backend."""
+    array = as_array(points)
+    np.testing.assert_array_equal(
+        scale(array, (Rational(1, 2), 3)),
+        as_array(scale(points, (Rational(1, 2), 3))),
+    )
+    np.testing.assert_array_equal(
+        shift(array, (1, 2)), as_array(shift(points, (1, 2)))
+    )
+    np.testing.assert_allclose(
+        rotate(array, pi / 2), as_array(rotate(points, pi / 2)), atol=1e-15
+    )
+
+
+def test_exact_shift() -> None:
+    """Test that fractions of common denominators are shifted exactly."""
+    exact = [(Fraction(-7999, 125), Fraction(2, 49)), (Fraction(1, 3), 1)]
+    array = np.array(exact, dtype=np.float64)
+    denominators = common_denominators(array)
+    assert denominators == (375, 49)
+    assert (array + (60, 2)).tolist() != [
+        [float(x + 60), float(y + 2)] for x, y in exact
+    ]
+    assert shift(array, (60, 2), denominators=denominators).tolist() == [
+        [float(x + 60), float(y + 2)] for x, y in exact
+    ]
+    assert common_denominators(np.array([[np.sqrt(2), 0.0]])) is None
+
+
+def test_backend_selection() -> None:
+    """Test per-call backend selection for sympy inputs."""
+    shifted = shift(points, (1, 2), backend="numpy")
+    assert isinstance(shifted, np.ndarray)
+    np.testing.assert_array_equal(shifted, as_array(shift(points, (1, 2))))
+
+
+def test_numpy_hexagon() -> None:
+    """Test numeric hexagonal path generation."""
+    hexagon = regular_polygon_path(6, backend="numpy")
+    assert is_closed(hexagon)
+    np.testing.assert_allclose(
+        hexagon, as_array(regular_polygon_path(6)), atol=1e-15
+    )
+
+
+def test_lossless_simplification() -> None:
+    """Test dropping points between collinear segments of same direction."""
+    subdivided = [
+        Matrix([-2, -1]),
+        Matrix([0, -1]),
+        Matrix([2, -1]),
+        Matrix([2, 1]),
+        Matrix([2, 1]),
+        Matrix([-2, 1]),
+        Matrix([-2, -1]),
+    ]
+    assert simplify(subdivided) == points
+    np.testing.assert_array_equal(
+        simplify(as_array(subdivided)), as_array(points)
+    )
+    # A spike reversing direction is not redundant
+    spike = [Matrix([0, 0]), Matrix([2, 0]), Matrix([1, 0])]
+    assert simplify(spike) == spike
+
+
+def test_tolerance_simplification() -> None:
+    """Test dropping detail below a tolerance."""
+    jagged = as_array(
+        [Matrix(v) for v in [(0, 0), (1, 0.1), (2, -0.1), (3, 0), (3, 3)]]
+    )
+    np.testing.assert_array_equal(simplify(jagged, 0.2), jagged[[0, 3, 4]])
+    np.testing.assert_array_equal(simplify(jagged, 0.05), jagged)
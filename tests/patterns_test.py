@@ -0,0 +1,37 @@
+"""Unit tests for module `lib.patterns`."""
+
+from pathlib import Path
+import numpy as np
+import os
+import pytest
+import subprocess
+import sys
+
+from tilebg import patterns
+from tilebg.cache import GeometryCache
+
+
+def test_load() -> None:
+    """Test that every registered pattern can be loaded."""
+    for name in patterns.PATTERNS:
+        assert patterns.load(name).parameters
+    with pytest.raises(ValueError):
+        patterns.load("nonexistent")
+
+
+def test_numeric_paths_avoid_sympy(tmp_path: Path) -> None:
+    """Test that cached patterns are generated without importing sympy."""
+    cache = GeometryCache(directory=tmp_path)
+    # Any geometry will do, as long as no exact derivation is needed
+    entry = np.vstack(([[1, 0]], np.zeros((8, 2), dtype=np.int64)))
+    for name, iterations in [("gosper", 2), ("minkowski", 4)]:
+        cache.get_or_build(name, iterations, lambda _: entry)
+    code = (
+        "import sys\n"
+        "from tilebg import patterns\n"
+        "for name in patterns.PATTERNS:\n"
+        "    list(patterns.load(name).parameters()['paths'])\n"
+        "assert 'sympy' not in sys.modules\n"
+    )
+    env = dict(os.environ, TILEBG_CACHE_DIR=str(tmp_path))
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
@@ -0,0 +1,191 @@
+"""Unit tests for module `lib.raster`."""
+
+from collections.abc import Iterator
+from io import BytesIO
+from sympy import Matrix
+import numpy as np
+import pytest
+import struct
+import zlib
+
+from tilebg.grid import generate_grid
+from tilebg.raster import (
+    DEFAULT_STYLES,
+    iter_stamps,
+    rasterize,
+    render,
+    render_png,
+    write_png,
+)
+from tilebg.svg import SVGPolylines
+
+
+def test_default_styles() -> None:
+    """Test that colors are parsed from the CSS embedded into SVGs."""
+    assert DEFAULT_STYLES["stroke"]["stroke"] == "#202020"
+    assert DEFAULT_STYLES["stroke"]["stroke-width"] == "1"
+    assert DEFAULT_STYLES["fill-2"] == {"fill": "#505050"}
+
+
+def test_rasterize_square() -> None:
+    """Test coverage masks of a pixel-aligned and a half-pixel square."""
+    square = np.array([[1, 1], [3, 1], [3, 3], [1, 3], [1, 1]], dtype=float)
+    fill_mask, stroke_mask, x0, y0 = rasterize(square)
+    assert stroke_mask is None
+    assert fill_mask is not None
+    assert fill_mask.sum() == 4
+    assert fill_mask[1 - y0, 1 - x0] == fill_mask[2 - y0, 2 - x0] == 1
+    fill_mask, _, _, _ = rasterize(square + 0.5)
+    assert fill_mask is not None
+    assert fill_mask.sum() == 4
+    assert fill_mask.max() == 1
+    assert fill_mask[fill_mask > 0].min() == 0.25
+
+
+def test_render_grid() -> None:
+    """Test that a rectangular grid covers the whole image seamlessly."""
+    rectangle = [
+        Matrix([-2, -1]),
+        Matrix([2, -1]),
+        Matrix([2, 1]),
+        Matrix([-2, 1]),
+        Matrix([-2, -1]),
+    ]
+    tiles = generate_grid(
+        element_path=rectangle,
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=None,
+        svg_class_fn=lambda ix, iy: [f"fill-{(ix + iy) % 2}"],
+        instancing=True,
+    )
+    image = render(resolution=(8, 4), paths=tiles, scale=2)
+    assert image.shape == (8, 16, 4)
+    assert (image[..., 3] == 255).all()
+    # The bottom left tile is only a quarter visible after flipping y
+    assert (image[-2:, :4, :3] == 0x30).all()
+    assert (image[-2:, 4:12, :3] == 0x40).all()
+
+
+def test_stamp_styles() -> None:
+    """Test that shared masks are not reused across fill and stroke styles."""
+    rectangle = [
+        Matrix([-2, -1]),
+        Matrix([2, -1]),
+        Matrix([2, 1]),
+        Matrix([-2, 1]),
+        Matrix([-2, -1]),
+    ]
+    tiles = generate_grid(
+        element_path=rectangle,
+        spacings=(4, 2),
+        resolution=(8, 4),
+        offsets_fn=None,
+        svg_class_fn=lambda ix, iy: [["filled", "stroked"][ix % 2]],
+        instancing=True,
+    )
+    styles = {
+        "filled": {"fill": "#ff0000", "stroke-width": "0"},
+        "stroked": {"fill": "none", "stroke": "#0000ff"},
+    }
+    stamps = list(iter_stamps(resolution=(8, 4), paths=tiles, styles=styles))
+    assert {stamp.fill for stamp in stamps} == {(1.0, 0.0, 0.0), None}
+    for stamp in stamps:
+        assert (stamp.fill_mask is None) == (stamp.fill is None)
+        assert (stamp.stroke_mask is None) == (stamp.stroke is None)
+
+
+def test_reject_polylines() -> None:
+    """Test that shared-edge polylines are rejected with a clear error."""
+    polylines = SVGPolylines(
+        polylines=[np.array([[0.0, 0.0], [4.0, 0.0]])], svg_class=["stroke"]
+    )
+    with pytest.raises(ValueError, match="polylines"):
+        render(resolution=(8, 4), paths=[polylines])
+
+
+def read_chunks(data: bytes) -> Iterator[tuple[bytes, bytes]]:
+    while data:
+        (length,) = struct.unpack(">I", data[:4])
+        tag, chunk = data[4:8], data[8:][:length]
+        (crc,) = struct.unpack(">I", data[8:][length:][:4])
+        assert crc == zlib.crc32(tag + chunk)
+        yield tag, chunk
+        data = data[12:][length:]
+
+
+def test_write_png() -> None:
+    """Test PNG encoding of an image given in two bands."""
+    image = np.arange(3 * 2 * 4, dtype=np.uint8).reshape(3, 2, 4)
+    file = BytesIO()
+    write_png(file, [image[:1], image[1:]], (2, 3))
+    data = file.getvalue()
+    assert data.startswith(b"\x89PNG\r\n\x1a\n")
+    chunks = list(read_chunks(data[8:]))
+    assert chunks[0][0] == b"IHDR"
+    assert struct.unpack(">II", chunks[0][1][:8]) == (2, 3)
+    assert chunks[-1] == (b"IEND", b"")
+    raw = zlib.decompress(
+        b"".join(chunk for tag, chunk in chunks if tag == b"IDAT")
+    )
+    rows = np.frombuffer(raw, dtype=np.uint8).reshape(3, 9)
+    assert (rows[:, 0] == 0).all()
+    assert (rows[:, 1:].reshape(3, 2, 4) == image).all()
+
+
+def test_render_png_bands() -> None:
+    """Test that banded rendering matches rendering the whole image."""
+    hexagon = [Matrix(v) for v in [(0, 2), (2, 1), (2, -1), (0, -2)]]
+    hexagon += [Matrix(v) for v in [(-2, -1), (-2, 1), (0, 2)]]
+    parameters = dict(
+        element_path=hexagon,
+        spacings=(4, 3),
+        resolution=(16, 12),
+        offsets_fn=None,
+        svg_class_fn=lambda ix, iy: [f"fill-{(ix + 2 * iy) % 3}"],
+        instancing=True,
+    )
+    image = render(resolution=(16, 12), paths=generate_grid(**parameters))
+    for workers in (1, 2):
+        file = BytesIO()
+        render_png(
+            file,
+            resolution=(16, 12),
+            paths=generate_grid(**parameters),
+            band_rows=5,
+            workers=workers,
+        )
+        chunks = list(read_chunks(file.getvalue()[8:]))
+        raw = zlib.decompress(
+            b"".join(chunk for tag, chunk in chunks if tag == b"IDAT")
+        )
+        rows = np.frombuffer(raw, dtype=np.uint8).reshape(12, 1 + 16 * 4)
+        assert (rows[:, 1:].reshape(12, 16, 4) == image).all()
+
+
+def test_render_png_bytes() -> None:
+    """Test that PNG files do not depend on the bands rendered."""
+    hexagon = [Matrix(v) for v in [(0, 2), (2, 1), (2, -1), (0, -2)]]
+    hexagon += [Matrix(v) for v in [(-2, -1), (-2, 1), (0, 2)]]
+    parameters = dict(
+        element_path=hexagon,
+        spacings=(4, 3),
+        resolution=(16, 12),
+        offsets_fn=None,
+        svg_class_fn=lambda ix, iy: [f"fill-{(ix + 2 * iy) % 3}"],
+        instancing=True,
+    )
+    files = []
+    for band_rows in (192, 50):
+        file = BytesIO()
+        # Without compression, data is available as soon as a band is ready
+        render_png(
+            file,
+            resolution=(16, 12),
+            paths=generate_grid(**parameters),
+            scale=16,
+            compress_level=0,
+            band_rows=band_rows,
+        )
+        files.append(file.getvalue())
+    assert files[0] == files[1]
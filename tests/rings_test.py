@@ -0,0 +1,42 @@
+"""Unit tests for module `lib.rings`."""
+
+import numpy as np
+
+from tilebg.rings import EISENSTEIN, GAUSSIAN, RingPath
+
+
+def test_multiply() -> None:
+    """Test that basis elements are roots of their minimal polynomials."""
+    u = np.array([[0, 1]])
+    # i**2 == -1
+    np.testing.assert_array_equal(GAUSSIAN.multiply(u, (0, 1)), [[-1, 0]])
+    # w**2 == -1 - w
+    np.testing.assert_array_equal(EISENSTEIN.multiply(u, (0, 1)), [[-1, -1]])
+
+
+def test_polygon() -> None:
+    """Test the vertices of a hexagon rotated clockwise by -w."""
+    hexagon = RingPath.polygon(EISENSTEIN, (0, -1), 6)
+    assert hexagon.is_closed()
+    x, y = np.sqrt(3) / 2, 0.5
+    np.testing.assert_allclose(
+        hexagon.as_array(),
+        [(0, 1), (x, y), (x, -y), (0, -1), (-x, -y), (-x, y), (0, 1)],
+        atol=1e-15,
+    )
+
+
+def test_refined() -> None:
+    """Test that refined paths keep their initial point and denominator."""
+    square = RingPath.polygon(GAUSSIAN, (0, -1), 4)
+    refined = square.refined([(2, 1), (1, -2), (2, 1)], 5)
+    assert (len(refined), refined.denominator) == (13, 5)
+    np.testing.assert_array_equal(refined.numerators[0], [5, 0])
+    assert refined.is_closed()
+
+
+def test_scaled_as_array() -> None:
+    """Test that points are scaled exactly before rounding to floats."""
+    path = RingPath(GAUSSIAN, np.array([[1, 1]]), 5)
+    assert (path.as_array() * 3).tolist() != [[-0.6, 0.6]]
+    assert path.as_array((3, 3)).tolist() == [[-0.6, 0.6]]
@@ -0,0 +1,82 @@
+"""Unit tests for module `lib.server`."""
+
+from typing import Any
+import asyncio
+
+from tilebg import patterns
+from tilebg.server import ResultCache, WallpaperServer
+from tilebg.svg import generate_svg
+
+
+async def get(port: int, target: str) -> tuple[bytes, bytes]:
+    """Return the status line and body of an HTTP GET response."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return head.split(b"\r\n")[0], body
+
+
+def test_result_cache() -> None:
+    """Test that least recently used values are evicted beyond the cap."""
+    cache = ResultCache(max_bytes=6)
+    cache.put("a", b"aa")
+    cache.put("b", b"bb")
+    assert cache.get("a") == b"aa"
+    cache.put("c", b"ccc")
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (b"aa", b"ccc")
+    cache.put("d", b"too large")
+    assert (len(cache), cache.total_bytes) == (2, 5)
+
+
+def test_server() -> None:
+    """Test serving, caching and coalescing of images."""
+    target = "/pattern/hexagons?seed=3&w=120&h=96"
+    parameters = patterns.hexagons.parameters(resolution=(120, 96), seed=3)
+    expected_svg = f"{generate_svg(**parameters)}\n".encode()
+
+    async def run() -> None:
+        with WallpaperServer(workers=2) as server:
+            async with await server.start("127.0.0.1", 0) as http_server:
+                port = http_server.sockets[0].getsockname()[1]
+                responses = await asyncio.gather(
+                    *(get(port, target) for _ in range(3))
+                )
+                assert responses == 3 * [(b"HTTP/1.1 200 OK", expected_svg)]
+                assert (server.renders, server.coalesced) == (1, 2)
+
+                assert await get(port, target) == responses[0]
+                assert server.renders == 1
+
+                status, body = await get(port, target.replace("?", ".png?"))
+                assert status == b"HTTP/1.1 200 OK"
+                assert body.startswith(b"\x89PNG")
+
+                for bad_target, code in [
+                    ("/pattern/unknown", b"404"),
+                    ("/pattern/hexagons?w=100", b"400"),
+                    ("/pattern/hexagons?seed=x", b"400"),
+                ]:
+                    status, _ = await get(port, bad_target)
+                    assert status.split()[1] == code
+
+    asyncio.run(run())
+
+
+def test_server_error() -> None:
+    """Test that unexpected failures are answered by an error response."""
+
+    async def failing_image(key: Any) -> bytes:
+        raise RuntimeError("broken process pool")
+
+    async def run() -> None:
+        with WallpaperServer(workers=1) as server:
+            setattr(server, "image", failing_image)
+            async with await server.start("127.0.0.1", 0) as http_server:
+                port = http_server.sockets[0].getsockname()[1]
+                status, _ = await get(port, "/pattern/hexagons")
+                assert status == b"HTTP/1.1 500 Internal Server Error"
+
+    asyncio.run(run())
@@ -1,9 +1,28 @@
 """Unit tests for module `lib.svg`."""
 
+from functools import partial
+from io import StringIO
 from pathlib import Path
 from sympy import Matrix
+import gzip
+import numpy as np
+import pytest
 
-from tilebg.svg import SVGPath, generate_svg
+from tilebg import patterns
+from tilebg.grid import generate_compact_grid, recolor
+from tilebg.svg import (
+    SVGPath,
+    SVGPathTemplate,
+    SVGPolylines,
+    SVGSkeleton,
+    SVGUse,
+    format_points,
+    generate_svg,
+    iter_svg,
+    open_svg,
+    write_svg,
+    write_svg_chunks,
+)
 
 
 expected_svg = """\
@@ -51,3 +70,183 @@ def test_svg_generation() -> None:
         ],
     )
     assert svg == expected_svg
+
+
+def test_path_equality() -> None:
+    """Test that array-backed paths compare by value."""
+    points = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+    path = SVGPath(points=points, svg_class=["stroke"])
+    assert path == SVGPath(points=points.copy(), svg_class=["stroke"])
+    assert path != SVGPath(points=points + 1, svg_class=["stroke"])
+    assert path != SVGPath(points=points, svg_class=["fill-0"])
+    assert path == SVGPath(
+        points=[Matrix([0, 0]), Matrix([1, 0]), Matrix([0, 1])],
+        svg_class=["stroke"],
+    )
+
+
+def test_svg_streaming() -> None:
+    """Test that streamed SVG code is identical to the generated one."""
+    path = SVGPath(
+        points=[Matrix([-2, -1]), Matrix([2, -1]), Matrix([2, 1])],
+        svg_class=["stroke"],
+    )
+    kwargs = dict(author="author", title="title", resolution=(200, 100))
+    chunks = list(iter_svg(paths=iter([path, path]), **kwargs))
+    assert len(chunks) == 4
+    file = StringIO()
+    write_svg(file, paths=[path, path], **kwargs)
+    assert "".join(chunks) == file.getvalue()
+    assert file.getvalue() == generate_svg(paths=[path, path], **kwargs)
+
+
+def test_svg_instancing() -> None:
+    """Test that a shared path is defined once before its first instance."""
+    element = SVGPath(
+        points=[Matrix([0, 0]), Matrix([1, 0]), Matrix([0, 1])],
+        svg_class=[],
+        id="element",
+    )
+    svg = generate_svg(
+        author="author",
+        title="title",
+        resolution=(200, 100),
+        paths=[
+            SVGUse(element=element, offsets=(0, 0), svg_class=["fill-0"]),
+            SVGUse(element=element, offsets=(4, 2), svg_class=["fill-1"]),
+        ],
+    )
+    assert svg.count("<defs>") == 1
+    assert (
+        '<defs><path id="element" class="" d="M 0.0,0.0 1.0,0.0 0.0,1.0"/>'
+        "</defs>\n"
+        '<use class="fill-0" xlink:href="#element" x="0.0" y="0.0"/>\n'
+        '<use class="fill-1" xlink:href="#element" x="4.0" y="2.0"/>\n'
+    ) in svg
+
+
+def test_path_template() -> None:
+    """Test formatting relative path data of a shifted closed path."""
+    template = SVGPathTemplate.compile(
+        [
+            Matrix([-2, -1]),
+            Matrix([2, -1]),
+            Matrix([2, 1]),
+            Matrix([-2, 1]),
+            Matrix([-2, -1]),
+        ]
+    )
+    tail = " l 4.0,0.0 0.0,2.0 -4.0,0.0 z"
+    assert template.format((0, 0)) == f"m -2.0,-1.0{tail}"
+    assert template.format((3, 4)) == f"m 1.0,3.0{tail}"
+
+
+def test_relative_size() -> None:
+    """Test that relative path data is not larger than absolute one."""
+    for name in patterns.PATTERNS:
+        sizes = [
+            len(
+                generate_svg(
+                    **patterns.load(name).parameters(
+                        resolution=(240, 240), relative=relative
+                    )
+                )
+            )
+            for relative in [False, True]
+        ]
+        assert sizes[1] <= sizes[0]
+
+
+def test_polylines() -> None:
+    """Test serialization of open polylines into a single unfilled path."""
+    polylines = SVGPolylines(
+        polylines=[
+            [Matrix([0, 0]), Matrix([1, 0]), Matrix([1, 1])],
+            [Matrix([2, 0]), Matrix([3, 0])],
+        ],
+        svg_class=["stroke"],
+    )
+    assert str(polylines) == (
+        '<path class="stroke" fill="none" '
+        'd="M 0.0,0.0 1.0,0.0 1.0,1.0 M 2.0,0.0 3.0,0.0"/>'
+    )
+
+
+def test_skeleton() -> None:
+    """Test that recoloring through a skeleton matches full serialization."""
+    tiles = generate_compact_grid(
+        element_path=[Matrix(v) for v in [(0, 0), (1, 0), (0, 1), (0, 0)]],
+        spacings=(1, 1),
+        resolution=(2, 2),
+        offsets_fn=None,
+        svg_class_fn=lambda ix, iy: ["stroke", f"fill-{ix}"],
+        relative=True,
+    )
+    metadata = dict(author="author", title="title", resolution=(2, 2))
+    skeleton = SVGSkeleton.compile(**metadata, paths=tiles)
+    assert skeleton.format(tiles) == generate_svg(**metadata, paths=tiles)
+    recolored = recolor(tiles, lambda ix, iy: [f"fill-{iy}"])
+    assert not np.array_equal(recolored.class_indices, tiles.class_indices)
+    assert skeleton.format(recolored) == generate_svg(
+        **metadata, paths=recolored
+    )
+
+
+def test_chunked_svg() -> None:
+    """Test that chunks written by a process pool match serial writing."""
+    metadata = dict(author="author", title="title", resolution=(120, 96))
+    for instancing in [False, True]:
+        options = dict(resolution=(120, 96), instancing=instancing)
+        file = StringIO()
+        write_svg_chunks(
+            file,
+            **metadata,
+            paths_fn=partial(patterns.grid_chunk, "hexagons", options),
+            chunk_count=5,
+            workers=2,
+        )
+        assert file.getvalue() == generate_svg(
+            **metadata, paths=patterns.hexagons.parameters(**options)["paths"]
+        )
+
+
+def test_svgz(tmp_path: Path) -> None:
+    """Test that SVGZ files are compressed reproducibly."""
+    params = patterns.hexagons.parameters(resolution=(120, 96))
+    params["paths"] = list(params["paths"])
+    svg = generate_svg(**params)
+    path = tmp_path / "bg.svgz"
+    contents = []
+    for _ in range(2):
+        with open_svg(path, compress_level=9) as file:
+            write_svg(file, **params)
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            assert file.read() == svg
+        contents.append(path.read_bytes())
+    assert contents[0] == contents[1]
+    assert len(contents[0]) < len(svg) // 2
+
+
+def test_format_points() -> None:
+    """Test rounding coordinates without trailing zeros and negative zeros."""
+    points = np.array([[-0.0001, 1.25], [2.0, -3.5], [100.0, 0.1 + 0.2]])
+    assert format_points(points) == (
+        "-0.0001,1.25 2.0,-3.5 100.0,0.30000000000000004"
+    )
+    assert format_points(points, 2) == "0,1.25 2,-3.5 100,0.3"
+    assert format_points(points, 0) == "0,1 2,-4 100,0"
+    assert format_points(points, 15) == "-0.0001,1.25 2,-3.5 100,0.3"
+    assert format_points(np.array([[1e20, -0.5]]), 1) == (
+        "100000000000000000000,-0.5"
+    )
+    for decimals in [-1, 16]:
+        with pytest.raises(ValueError):
+            format_points(points, decimals)
+
+
+def test_rounded_path_template() -> None:
+    """Test that relative moves are differences of rounded points."""
+    template = SVGPathTemplate.compile(
+        np.array([[0.0, 0.0], [0.4, 0.0], [0.8, 0.0], [0.0, 0.0]]), 0
+    )
+    assert template.format((1, 2)) == "m 1,2 l 0,0 1,0 z"